@@ -1,18 +1,12 @@
 import os
-import re
-import requests
 import streamlit as st
 from dotenv import load_dotenv
-from PIL import Image
-from bs4 import BeautifulSoup
-from langchain.prompts import PromptTemplate
-from langchain_openai import AzureChatOpenAI
-from langchain.agents import initialize_agent, Tool
-from langchain.agents.agent_types import AgentType
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_tavily import TavilySearch
-from langchain_community.utilities import SerpAPIWrapper
+from langchain_core.prompts import PromptTemplate
 from fill_template import fill_word_template
+from resources import load_logo, start_warm_up
+from scraper import scrape_company_website
+from summary import SUMMARY_FAILED, SummaryStream
+from tracing import trace_request
 
 # -------------------------
 # Load environment variables
@@ -23,75 +17,6 @@ OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
-# -------------------------
-def google_search(query):
-    search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(search_url, headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
-    for g in soup.find_all('div', class_='tF2Cxc'):
-        link = g.find('a')['href']
-        return link
-    return None
-
-# -------------------------
-def scrape_company_website(company_name):
-    info = {k: "" for k in [
-        "company_name", "address", "employee_count", "annual_revenue", "leadership_changes",
-        "recent_news", "recent_funding", "current_erp", "recent_sap_job_postings",
-        "phone_number", "sic_codes", "company_official_website",
-        "strengths", "weaknesses", "opportunities", "threats"]}
-    info["company_name"] = company_name
-    info["company_official_website"] = google_search(f"{company_name} official site") or ""
-
-    try:
-        if info["company_official_website"]:
-            response = requests.get(info["company_official_website"], timeout=10)
-            soup = BeautifulSoup(response.text, "html.parser")
-            text = soup.get_text(separator=" ", strip=True)
-
-            patterns = {
-                "phone_number": r'(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})',
-                "address": r'\d{1,5}\s[\w\s.,-]+,\s\w+,\s[A-Z]{2}\s\d{5}(-\d{4})?',
-                "employee_count": r'([0-9,]+)\s+(employees|staff|workers|team)',
-                "annual_revenue": r'(revenue|sales|turnover)[\s\w]{0,20}?\$?([\d,.]+)\s?(million|billion)?',
-                "sic_codes": r'SIC Code[:\s]*([\d]{4})'
-            }
-
-            for key, pattern in patterns.items():
-                match = re.search(pattern, text, re.I)
-                if match:
-                    value = match.group(2).replace(',', '') if key == "annual_revenue" else match.group(1)
-                    info[key] = f"${value} {match.group(3)}".strip() if key == "annual_revenue" else value
-
-            keywords = {
-                "leadership_changes": ['ceo', 'appointed', 'joined', 'leadership'],
-                "recent_news": ['news', 'announcement', 'press release'],
-                "strengths": ['strength'],
-                "weaknesses": ['weakness'],
-                "opportunities": ['opportunit'],
-                "threats": ['threat']
-            }
-            for key, kwds in keywords.items():
-                snippets = [line.strip() for line in text.split('.') if any(k in line.lower() for k in kwds)]
-                info[key] = ' '.join(snippets[:3]) or "Not Available"
-
-            for erp in ['SAP', 'Oracle ERP', 'Microsoft Dynamics', 'NetSuite', 'Infor']:
-                if erp.lower() in text.lower():
-                    info["current_erp"] = erp
-                    break
-
-            postings = [a.get_text(strip=True) for a in soup.find_all('a')
-                        if any(k in a.get_text(strip=True).lower() for k in ['sap', 'erp'])]
-            info["recent_sap_job_postings"] = ', '.join(postings) or "No SAP job postings found"
-
-    except Exception as e:
-        print(f"Scraping error: {e}")
-    return info
-
-# -------------------------
-llm = AzureChatOpenAI(deployment_name="gpt-4o", model_name="gpt-4o", temperature=0.7)
-
 # -------------------------
 prompt_template = PromptTemplate(
     input_variables=["company_name", "scraped_data"],
@@ -99,7 +24,10 @@ prompt_template = PromptTemplate(
 You are a business intelligence assistant creating a report on **{company_name}**.
 
 Return a fact-based, **plain text** report with no markdown formatting. Use no asterisks (*) or hashtags (#) in the final document.
-Use the **Tavily Search tool** to enrich any missing information & give me more descriptive answers.
+Use the web research notes below to enrich any missing information & give me more descriptive answers.
+
+Web research notes:
+{scraped_data[web_research]}
 
 **Company Report**
 
@@ -159,18 +87,11 @@ Some data may be incomplete or outdated. For the most accurate and timely inform
 """
 )
 
-def generate_summary(company_name, scraped_data):
-    try:
-        prompt = prompt_template.format(company_name=company_name, scraped_data=scraped_data)
-        return llm.invoke(prompt).content.strip()
-    except Exception as e:
-        st.error(f"Summary generation error: {e}")
-        return "Summary generation failed."
-
 # -------------------------
 # Streamlit UI
 st.set_page_config(page_title="AI Sales Research", page_icon="🤖", layout="wide")
-logo = Image.open("Logo-White.png")
+logo = load_logo()
+start_warm_up()
 
 st.markdown(
     """
@@ -313,20 +234,22 @@ if user_input:
     if user_input not in st.session_state["search_history"]:
         st.session_state["search_history"].append(user_input)
 
-    with st.spinner(f"Searching for **{user_input}**..."):
-        company_info = scrape_company_website(user_input)
+    with trace_request("research", company=user_input, source="app-main") as trace:
+        with st.spinner(f"Searching for **{user_input}**..."):
+            company_info = scrape_company_website(user_input)
 
-    with st.spinner("Generating report..."):
-        report = generate_summary(user_input, company_info)
+        st.write(f"### Report for {user_input}")
+        summary_stream = SummaryStream(user_input, company_info, template=prompt_template, on_error=st.error)
+        st.write_stream(summary_stream)
+        report = summary_stream.text
+        if summary_stream.failed:
+            trace.error = SUMMARY_FAILED
 
-    # Save report
-    st.session_state[user_input] = report
+        # Save report
+        st.session_state[user_input] = report
 
-    st.write(f"### Report for {user_input}")
-    st.markdown(report)
-
-    template_path = "ModelTemplate.docx"
-    doc_file = fill_word_template(template_path, report)
+        template_path = "ModelTemplate.docx"
+        doc_file = fill_word_template(template_path, report)
 
     st.download_button(
         label="📄 Download Report",
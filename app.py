@@ -1,18 +1,22 @@
 import os
-import re
-import requests
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
-from PIL import Image
-from bs4 import BeautifulSoup
-from langchain.prompts import PromptTemplate
-from langchain_openai import AzureChatOpenAI
-from langchain.agents import initialize_agent, Tool
-from langchain.agents.agent_types import AgentType
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_tavily import TavilySearch
-from langchain_community.utilities import SerpAPIWrapper
-from fill_template import fill_word_template
+from config import JOB_POLL_SECONDS
+from entities import alias_index, company_key
+from fill_template import cached_report_docx, render_report_docx
+from http_client import connection_stats
+from jobs import ACTIVE_STATES, FAILED
+from resources import job_queue as load_job_queue, load_logo, report_store as load_report_store, start_warm_up
+from model_router import route_stats
+from page_store import page_store
+from parsing import parse_stats
+from rate_limiter import rate_stats
+from search import research_search, site_search
+from shared_cache import lock_stats
+from singleflight import coalescing_stats
+from summary import latency_stats, response_cache
+from tracing import trace_request
 
 # -------------------------
 # Load environment variables from .env file
@@ -27,196 +31,60 @@ SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
 # -------------------------
-# Google Fallback
-def google_search(query):
-    search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(search_url, headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
-    for g in soup.find_all('div', class_='tF2Cxc'):
-        link = g.find('a')['href']
-        return link
-    return None
+# Shared Resources (built once per process, reused across reruns)
 
-# -------------------------
-# Scraper
-def scrape_company_website(company_name):
-    company_info = {
-        "company_name": company_name,
-        "address": "",
-        "employee_count": "",
-        "annual_revenue": "",
-        "leadership_changes": "",
-        "recent_news": "",
-        "recent_funding": "",
-        "current_erp": "",
-        "recent_sap_job_postings": "",
-        "phone_number": "",
-        "sic_codes": "",
-        "company_official_website": "",
-        "strengths": "",
-        "weaknesses": "",
-        "opportunities": "",
-        "threats": ""
-    }
-
-    company_website = google_search(f"{company_name} official site")
-    if not company_website:
-        return company_info
-
-    try:
-        response = requests.get(company_website, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        text = soup.get_text(separator=" ", strip=True)
-
-        phone_match = re.search(r'(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})', text)
-        if phone_match:
-            company_info["phone_number"] = phone_match.group(0)
-
-        address_match = re.search(r'\d{1,5}\s[\w\s.,-]+,\s\w+,\s[A-Z]{2}\s\d{5}(-\d{4})?', text)
-        if address_match:
-            company_info["address"] = address_match.group(0)
-
-        emp_match = re.search(r'([0-9,]+)\s+(employees|staff|workers|team)', text, re.I)
-        if emp_match:
-            company_info["employee_count"] = emp_match.group(1).replace(',', '')
-
-        revenue_match = re.search(r'(revenue|annual revenue|sales|turnover)[\s\w]{0,20}?\$?([\d,.]+)\s?(million|billion)?', text, re.I)
-        if revenue_match:
-            rev_num = revenue_match.group(2).replace(',', '')
-            rev_unit = revenue_match.group(3) or ''
-            company_info["annual_revenue"] = f"${rev_num} {rev_unit}".strip()
-
-        leadership_snippets = [line.strip() for line in text.split('.') if any(word in line.lower() for word in ['ceo', 'appointed', 'named', 'joined', 'leadership'])]
-        company_info["leadership_changes"] = ' '.join(leadership_snippets[:3])
+report_store = load_report_store()
+job_queue = load_job_queue()
+start_warm_up()
 
-        news_snippets = [line.strip() for line in text.split('.') if any(word in line.lower() for word in ['news', 'announcement', 'press release', 'update'])]
-        company_info["recent_news"] = ' '.join(news_snippets[:3])
-
-        funding_match = re.search(r'\$?([\d,.]+)\s?(million|billion)?\s+(funding|investment|raised|round)', text, re.I)
-        if funding_match:
-            amt = funding_match.group(1).replace(',', '')
-            unit = funding_match.group(2) or ''
-            company_info["recent_funding"] = f"${amt} {unit}".strip()
-
-        erp_keywords = ['SAP', 'Oracle ERP', 'Microsoft Dynamics', 'NetSuite', 'Infor']
-        for erp in erp_keywords:
-            if erp.lower() in text.lower():
-                company_info["current_erp"] = erp
-                break
-
-        job_postings = [a.get_text(strip=True) for a in soup.find_all('a') if any(keyword.lower() in a.get_text(strip=True).lower() for keyword in ['sap', 'erp'])]
-        company_info["recent_sap_job_postings"] = ', '.join(job_postings) if job_postings else "No SAP job postings found."
-
-        sic_match = re.search(r'SIC Code[:\s]*([\d]{4})', text, re.I)
-        if sic_match:
-            company_info["sic_codes"] = sic_match.group(1)
+# -------------------------
+# Word Export
 
-        strengths = [line.strip() for line in text.split('.') if 'strength' in line.lower()]
-        weaknesses = [line.strip() for line in text.split('.') if 'weakness' in line.lower()]
-        opportunities = [line.strip() for line in text.split('.') if 'opportunit' in line.lower()]
-        threats = [line.strip() for line in text.split('.') if 'threat' in line.lower()]
+def prepare_report(company_name, report_text):
+    with trace_request("export", company=company_name, source="app"):
+        render_report_docx(report_text)
 
-        company_info["strengths"] = ' '.join(strengths) if strengths else "Not Available"
-        company_info["weaknesses"] = ' '.join(weaknesses) if weaknesses else "Not Available"
-        company_info["opportunities"] = ' '.join(opportunities) if opportunities else "Not Available"
-        company_info["threats"] = ' '.join(threats) if threats else "Not Available"
-        company_info["company_official_website"] = company_website
 
-    except Exception as e:
-        print(f"Error scraping {company_name}: {e}")
+def report_download(company_name, report_text, label, key):
+    """Shows the download button once the .docx exists; until then a button that renders it on click.
 
-    return company_info
+    Rendering runs in the click callback, so the rerun that follows already
+    finds the bytes in the render cache whichever path displays the report.
+    """
+    doc_bytes = cached_report_docx(report_text)
+    if doc_bytes is None:
+        st.button("📄 Prepare Word Report", key=f"prepare_{key}", on_click=prepare_report, args=(company_name, report_text))
+        return
 
-# -------------------------
-# Initialize LLM and Agent
-
-llm = AzureChatOpenAI(deployment_name="gpt-4o", model_name="gpt-4o", temperature=0.7)
-
-tavily_tool = TavilySearch()
-duckduckgo_tool = DuckDuckGoSearchRun()
-serpapi_tool = SerpAPIWrapper()
-
-tools = [
-    Tool(
-        name="Tavily Search",
-        func=tavily_tool.run,
-        description="FAST and ACCURATE. Use this for company ERP systems, SAP jobs, funding updates, leadership changes, SWOT, or financials."
-    ),
-    Tool(
-        name="DuckDuckGo Search",
-        func=duckduckgo_tool.run,
-        description="Basic search. Use ONLY if Tavily fails."
-    ),
-    Tool(
-        name="Google Search via SerpAPI",
-        func=serpapi_tool.run,
-        description="Google search via SerpAPI. Only use if Tavily returns nothing."
+    st.download_button(
+        label=label,
+        data=doc_bytes,
+        file_name=f"{company_name}_Report.docx",
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        key=f"download_{key}"
     )
-]
-
-agent = initialize_agent(tools, llm=llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, verbose=True, handle_parsing_errors=True)
 
 # -------------------------
-# Prompt Template
-
-prompt_template = PromptTemplate(
-    input_variables=["company_name", "scraped_data"],
-    template="""
-You are a business intelligence assistant creating a report on **{company_name}**.
-Use the **Tavily Search tool** to enrich any missing information.
-
-**Company Report**
-
-## Company Overview
-- **Company Name:** {company_name}
-- **Address:** {scraped_data[address]}
-- **Employee Count:** {scraped_data[employee_count]}
-- **Annual Revenue:** {scraped_data[annual_revenue]}
-
-## Recent Developments
-- **Leadership Changes:** {scraped_data[leadership_changes]}
-- **Recent News:** {scraped_data[recent_news]}
-- **Recent SAP Job Postings:** {scraped_data[recent_sap_job_postings]}
-
-## Financial & Industry Insights
-- **Recent Funding:** {scraped_data[recent_funding]}
-- **ERP System:** {scraped_data[current_erp]}
-- **SIC Codes:** {scraped_data[sic_codes]}
-
-## SWOT Analysis
-- **Strengths:** {scraped_data[strengths]}
-- **Weaknesses:** {scraped_data[weaknesses]}
-- **Opportunities:** {scraped_data[opportunities]}
-- **Threats:** {scraped_data[threats]}
-
-## Contact Information
-- **Phone:** {scraped_data[phone_number]}
-- **Address:** {scraped_data[address]}
-- **Official Website:** {scraped_data[company_official_website]}
-
-## Disclaimer
-Some info may be outdated. Refer to the official website for the latest updates.
-"""
-)
-
-# -------------------------
-# Final Report Generator
-
-def generate_summary(company_name, scraped_data):
-    prompt = prompt_template.format(company_name=company_name, scraped_data=scraped_data)
-    try:
-        response = llm.invoke(prompt)
-        return response.content.strip()
-    except Exception as e:
-        st.error(f"Error generating summary: {e}")
-        return "Summary generation failed."
+# Background Research
+#
+# Research runs as a job on the shared worker pool (jobs.py), so reruns from
+# widget interactions no longer discard it. The page only polls the job.
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id):
+    """Shows a running job's stage and the report so far; reruns the page once the job has finished."""
+    job = job_queue.get(job_id)
+    if job is None or job["status"] not in ACTIVE_STATES:
+        st.rerun()
+    st.info(f"{job['stage']}...")
+    if job["partial"]:
+        st.markdown(job["partial"])
 
 # -------------------------
 # Streamlit UI
 
 st.set_page_config(page_title="AI Sales Research", page_icon="🤖", layout="wide")
-logo = Image.open("Logo-White.png")
+logo = load_logo()
 
 st.markdown(
     """
@@ -295,9 +163,20 @@ st.write("ℹ️ Enter a company name to fetch insights and generate a structure
 if "search_history" not in st.session_state:
     st.session_state["search_history"] = []
 
+# company key -> the history entry for it, so "Apple Inc." reopens an earlier "apple"
+if "history_keys" not in st.session_state:
+    st.session_state["history_keys"] = {}
+
 if "selected_company" not in st.session_state:
     st.session_state["selected_company"] = None
 
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
+# company -> ID of its research job, until the job has finished
+if "jobs" not in st.session_state:
+    st.session_state["jobs"] = {}
+
 # Add a horizontal line
 st.markdown("<hr style='border: 1px solid #ffffff55;'>", unsafe_allow_html=True)
 
@@ -308,7 +187,7 @@ st.markdown(
             <strong>Note:</strong>
             <ul style="padding-left: 18px; line-height: 1.6; margin-top: 10px;">
                 <li>This app uses a dark theme. If your system uses a light/default theme, go to the top-right settings ( : ) and switch to <strong>Dark</strong> mode for optimal experience.</li>
-                <li>Search history will reset on page reload. Each report is navigable, so ensure you <strong>download</strong> your reports before refreshing.</li>
+                <li>Search history will reset on page reload. Finished reports are kept for a while and reused when the same company is searched again.</li>
             </ul>
         </div>
         """,
@@ -329,54 +208,100 @@ if st.sidebar.button("New Research"):
     st.session_state["selected_company"] = None
     st.rerun()
 
+cache_stats = report_store.stats()
+st.sidebar.caption(f"Report cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+llm_cache_stats = response_cache.stats()
+st.sidebar.caption(f"LLM cache: {llm_cache_stats['hit_ratio']:.0%} hit ratio, {llm_cache_stats['bytes_saved'] / 1024:.0f} KiB saved")
+llm_latency = latency_stats()
+if llm_latency["reports"]:
+    st.sidebar.caption(f"Median time to first token: {llm_latency['ttft_p50']:.1f}s")
+search_stats = [site_search.stats(), research_search.stats()]
+st.sidebar.caption(
+    f"Search cache: {sum(s['hits'] for s in search_stats)} hits / {sum(s['misses'] for s in search_stats)} misses, "
+    f"{sum(s['shared_hits'] for s in search_stats)} from other servers, "
+    f"{sum(s['hedges'] for s in search_stats)} hedged requests"
+)
+for route, stats in route_stats().items():
+    st.sidebar.caption(f"{route}: {stats['calls']} calls, p50 {stats['latency_p50']:.1f}s, ${stats['cost_usd']:.4f}")
+for provider, stats in rate_stats().items():
+    st.sidebar.caption(f"{provider} queue: {stats['queue_depth']} waiting, p95 wait {stats['wait_p95']:.1f}s")
+job_stats = job_queue.stats()
+st.sidebar.caption(f"Research jobs: {job_stats['queued']} queued, {job_stats['running']} running")
+connections = connection_stats()
+if connections["requests"]:
+    st.sidebar.caption(f"HTTP: {connections['requests']} requests, {connections['reuse_ratio']:.0%} on reused connections")
+parsing = parse_stats()
+if parsing["pages"]:
+    st.sidebar.caption(f"HTML parsing: {parsing['pages']} pages, {parsing['avg_ms']:.1f} ms average")
+pages = page_store().stats()
+if pages["not_modified"]:
+    st.sidebar.caption(f"Page refresh: {pages['not_modified']} unchanged (304), {pages['changed']} changed")
+aliases = alias_index().stats()
+if aliases["aliases"]:
+    st.sidebar.caption(f"Known companies: {aliases['entities']}, under {aliases['aliases']} spellings")
+lock_failures = lock_stats()["backend_failures"]
+if lock_failures:
+    st.sidebar.caption(f"Research locks: {lock_failures} granted without the shared backend (it failed)")
+coalesced = {name: stats["coalesced"] for name, stats in coalescing_stats().items() if stats["coalesced"]}
+if coalesced:
+    st.sidebar.caption("Coalesced requests: " + ", ".join(f"{name} {count}" for name, count in coalesced.items()))
+
 # Update session state
 st.session_state["selected_company"] = selected_company if selected_company else None
 
 # Display Report for selected company 
 if selected_company:
     st.write(f"### Report for {selected_company}")
-    if selected_company in st.session_state:
-        report_text = st.session_state[selected_company]
-        st.markdown(report_text)
-
-        # Download Button for previous report
-        template_path = "ModelTemplate.docx"
-        doc_file = fill_word_template(template_path, report_text)
-
-        st.download_button(
-            label="📄 Download Again",
-            data=doc_file,
-            file_name=f"{selected_company}_Report.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+    job_id = st.session_state["jobs"].get(selected_company)
+    job = job_queue.get(job_id) if job_id else None
+
+    if job is not None and job["status"] in ACTIVE_STATES:
+        job_progress(job_id)
     else:
-        st.warning("No previous report found for this company.")
+        if job is not None:
+            # Finished: a successful job's report is in the report store now
+            del st.session_state["jobs"][selected_company]
+            if job["status"] == FAILED:
+                st.error(f"Research failed: {job['error']}")
+
+        if selected_company not in st.session_state:
+            stored_report = report_store.get(selected_company)
+            if stored_report:
+                st.session_state[selected_company] = stored_report
+
+        if selected_company in st.session_state:
+            report_text = st.session_state[selected_company]
+            st.markdown(report_text)
+
+            # Download Button for previous report
+            report_download(selected_company, report_text, "📄 Download Again", key=f"history_{selected_company}")
+        elif job is None:
+            st.warning("No previous report found for this company.")
 
 # Input for new company 
 user_input = st.chat_input("Enter a company name (Ex. Apple)...")
 
 if user_input:
-    if user_input not in st.session_state["search_history"]:
+    key = company_key(user_input)
+    if key not in st.session_state["history_keys"]:
+        st.session_state["history_keys"][key] = user_input
         st.session_state["search_history"].append(user_input)
-
-    with st.spinner(f"Searching for **{user_input}**..."):
-        company_info = scrape_company_website(user_input)
-
-    with st.spinner("Generating report..."):
-        report = generate_summary(user_input, company_info)
-
-    # Save report
-    st.session_state[user_input] = report
+    user_input = st.session_state["history_keys"][key]
 
     st.write(f"### Report for {user_input}")
-    st.markdown(report)
-
-    template_path = "ModelTemplate.docx"
-    doc_file = fill_word_template(template_path, report)
-
-    st.download_button(
-        label="📄 Download Report",
-        data=doc_file,
-        file_name=f"{user_input}_Report.docx",
-        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    )
+    # A fresh saved report is shown right away; otherwise research is queued as a background job
+    job_id = st.session_state["jobs"].get(user_input)
+    report = report_store.get(user_input) if job_id is None else None
+    if report is None and job_id is None:
+        st.session_state.pop(user_input, None)
+        job_id = job_queue.submit(user_input, owner=st.session_state["session_id"])
+        st.session_state["jobs"][user_input] = job_id
+
+    # Keep it selected, so the reruns after the job finishes or a button click show it again
+    st.session_state["selected_company"] = user_input
+    if report is not None:
+        st.session_state[user_input] = report
+        st.markdown(report)
+        report_download(user_input, report, "📄 Download Report", key=f"new_{user_input}")
+    else:
+        job_progress(job_id)
@@ -0,0 +1,150 @@
+"""Headless batch research: reads a CSV of company names and writes one .docx report per company.
+
+Usage:
+    python batch.py accounts.csv --out reports --workers 8
+
+Each finished company is appended to <out>/manifest.jsonl as soon as it
+completes, so rerunning the same command after a crash skips everything
+that already succeeded.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fill_template import render_report_docx
+from entities import company_key
+from report_store import ReportStore
+from scraper import scrape_company_website
+from summary import SUMMARY_FAILED, generate_summary, report_fingerprints
+from tracing import trace_request
+
+NAME_COLUMNS = ("company", "company_name", "name", "account")
+
+
+def read_companies(csv_path, column=None):
+    """Returns the unique company names in the CSV, in file order."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if column:
+        index, rows = header.index(column.lower()), rows[1:]
+    else:
+        matches = [i for i, cell in enumerate(header) if cell in NAME_COLUMNS]
+        index, rows = (matches[0], rows[1:]) if matches else (0, rows)
+
+    companies = {}
+    for row in rows:
+        if len(row) > index and row[index].strip():
+            companies.setdefault(company_key(row[index]), row[index].strip())
+    return list(companies.values())
+
+
+def load_manifest(manifest_path):
+    """Returns the keys of companies that already finished successfully."""
+    done = set()
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a partial last line left by a crash
+                if record.get("status") == "ok":
+                    done.add(company_key(record["company"]))
+    return done
+
+
+def report_filename(company_name):
+    """The cleaned company name plus a short hash of its company key.
+
+    Distinct companies can clean to the same name ("AT&T" and "AT T"), and
+    one report would silently overwrite the other.
+    """
+    safe_name = re.sub(r"[^\w.-]+", "_", company_name).strip("_")
+    digest = hashlib.sha256(company_key(company_name).encode("utf-8")).hexdigest()[:8]
+    return f"{safe_name}_{digest}_Report.docx"
+
+
+def research_company(company_name, out_dir, report_store):
+    started = time.time()
+    record = {"company": company_name, "status": "ok", "docx": "", "error": "", "cached": False}
+    with trace_request("batch", company=company_name) as trace:
+        try:
+            report = report_store.get(company_name)
+            record["cached"] = report is not None
+            if report is None:
+                company_info = scrape_company_website(company_name)
+                # A stale report is refreshed: only the sections whose fields changed are rewritten
+                report = generate_summary(company_name, company_info, previous=report_store.latest(company_name))
+                if report == SUMMARY_FAILED:
+                    raise RuntimeError(SUMMARY_FAILED)
+                report_store.put(company_name, report, report_fingerprints(company_name, company_info))
+
+            docx_path = os.path.join(out_dir, report_filename(company_name))
+            with open(docx_path, "wb") as f:
+                f.write(render_report_docx(report))
+            record["docx"] = docx_path
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            trace.error = str(e)
+        record["trace_id"] = trace.id
+    record["seconds"] = round(time.time() - started, 2)
+    record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return record
+
+
+def run_batch(csv_path, out_dir, workers=4, column=None):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+
+    companies = read_companies(csv_path, column)
+    done = load_manifest(manifest_path)
+    pending = [name for name in companies if company_key(name) not in done]
+    print(f"{len(companies)} companies, {len(companies) - len(pending)} already done, {len(pending)} to research")
+
+    report_store = ReportStore()
+    counts = {"ok": 0, "failed": 0}
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(manifest_path, "a", encoding="utf-8") as manifest:
+        futures = [pool.submit(research_company, name, out_dir, report_store) for name in pending]
+        for finished, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            counts[record["status"]] += 1
+
+            rate = finished / max(time.time() - started, 1e-9) * 60
+            status = record["status"] + (" (cached)" if record["cached"] else "")
+            print(f"[{finished}/{len(pending)}] {record['company']}: {status} in {record['seconds']}s "
+                  f"- {rate:.1f} companies/min")
+            if record["error"]:
+                print(f"    {record['error']}")
+
+    elapsed = time.time() - started
+    print(f"Finished {counts['ok']} ok, {counts['failed']} failed in {elapsed:.1f}s "
+          f"({len(pending) / max(elapsed, 1e-9) * 60:.1f} companies/min). Manifest: {manifest_path}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research a CSV of companies and write a .docx report for each.")
+    parser.add_argument("csv_path", help="CSV file with one company per row")
+    parser.add_argument("--out", default="reports", help="output directory for reports and manifest.jsonl")
+    parser.add_argument("--workers", type=int, default=4, help="companies researched in parallel")
+    parser.add_argument("--column", help="name of the CSV column holding company names")
+    args = parser.parse_args()
+    run_batch(args.csv_path, args.out, workers=args.workers, column=args.column)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Microbenchmark: single-pass field extraction vs. the previous per-field loops.
+
+Run from the repository root:
+    python -m benchmarks.bench_extraction
+"""
+import random
+import re
+import time
+
+from extraction import extract_company_info
+
+FILLER = (
+    "Our platform helps teams ship faster",
+    "We serve customers in over forty countries",
+    "Read the latest news and press release archive",
+    "Jane Doe was appointed CEO of the group",
+    "Our core strength is a loyal customer base",
+    "Supply chain disruption remains a threat",
+    "We see an opportunity in emerging markets",
+    "A weakness is our dependence on a few suppliers",
+    "The company has 12,500 employees worldwide",
+    "Annual revenue reached $4.2 billion",
+    "We run SAP S/4HANA across all plants",
+    "Visit us at 1 Main Street, Springfield, IL 62701",
+    "The company raised new capital in its latest funding round",
+)
+
+
+def legacy_extract(company_info, text, link_texts):
+    """The extraction loops as they were before the field-spec registry."""
+    phone_match = re.search(r'(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})', text)
+    if phone_match:
+        company_info["phone_number"] = phone_match.group(0)
+    address_match = re.search(r'\d{1,5}\s[\w\s.,-]+,\s\w+,\s[A-Z]{2}\s\d{5}(-\d{4})?', text)
+    if address_match:
+        company_info["address"] = address_match.group(0)
+    emp_match = re.search(r'([0-9,]+)\s+(employees|staff|workers|team)', text, re.I)
+    if emp_match:
+        company_info["employee_count"] = emp_match.group(1).replace(',', '')
+    revenue_match = re.search(r'(revenue|annual revenue|sales|turnover)[\s\w]{0,20}?\$?([\d,.]+)\s?(million|billion)?', text, re.I)
+    if revenue_match:
+        company_info["annual_revenue"] = f"${revenue_match.group(2).replace(',', '')} {revenue_match.group(3) or ''}".strip()
+    leadership_snippets = [line.strip() for line in text.split('.') if any(word in line.lower() for word in ['ceo', 'appointed', 'named', 'joined', 'leadership'])]
+    company_info["leadership_changes"] = ' '.join(leadership_snippets[:3])
+    news_snippets = [line.strip() for line in text.split('.') if any(word in line.lower() for word in ['news', 'announcement', 'press release', 'update'])]
+    company_info["recent_news"] = ' '.join(news_snippets[:3])
+    funding_match = re.search(r'\$?([\d,.]+)\s?(million|billion)?\s+(funding|investment|raised|round)', text, re.I)
+    if funding_match:
+        company_info["recent_funding"] = f"${funding_match.group(1).replace(',', '')} {funding_match.group(2) or ''}".strip()
+    for erp in ['SAP', 'Oracle ERP', 'Microsoft Dynamics', 'NetSuite', 'Infor']:
+        if erp.lower() in text.lower():
+            company_info["current_erp"] = erp
+            break
+    job_postings = [link for link in dict.fromkeys(link_texts) if any(keyword in link.lower() for keyword in ['sap', 'erp'])]
+    company_info["recent_sap_job_postings"] = ', '.join(job_postings) if job_postings else "No SAP job postings found."
+    sic_match = re.search(r'SIC Code[:\s]*([\d]{4})', text, re.I)
+    if sic_match:
+        company_info["sic_codes"] = sic_match.group(1)
+    strengths = [line.strip() for line in text.split('.') if 'strength' in line.lower()]
+    weaknesses = [line.strip() for line in text.split('.') if 'weakness' in line.lower()]
+    opportunities = [line.strip() for line in text.split('.') if 'opportunit' in line.lower()]
+    threats = [line.strip() for line in text.split('.') if 'threat' in line.lower()]
+    company_info["strengths"] = ' '.join(strengths) if strengths else "Not Available"
+    company_info["weaknesses"] = ' '.join(weaknesses) if weaknesses else "Not Available"
+    company_info["opportunities"] = ' '.join(opportunities) if opportunities else "Not Available"
+    company_info["threats"] = ' '.join(threats) if threats else "Not Available"
+    return company_info
+
+
+# Boilerplate repeated ahead of the distinct matches must not use up a field's limit
+REPEATED_PAGE = "Meet our CEO. Meet our CEO. Meet our CEO. New CEO Jane starts Monday."
+REPEATED_LEADERSHIP = "Meet our CEO New CEO Jane starts Monday"
+
+
+def make_page(sentences, seed=7):
+    # Numbered so no sentence repeats: extraction now drops repeated sentences, the legacy loops did not
+    rng = random.Random(seed)
+    return ". ".join(f"{rng.choice(FILLER)} in section {i}" for i in range(sentences)) + "."
+
+
+def make_boilerplate_page(sentences, seed=7):
+    """Like make_page, but unnumbered, so most sentences are repeats of the filler."""
+    rng = random.Random(seed)
+    return ". ".join(rng.choice(FILLER) for _ in range(sentences)) + "."
+
+
+def deduplicated_legacy(text, links):
+    """legacy_extract with each keyword field's repeated sentences dropped before its limit."""
+    info = legacy_extract({}, text, links)
+    lines = [line.strip() for line in text.split('.')]
+    for field, keywords, limit in (
+        ("leadership_changes", ['ceo', 'appointed', 'named', 'joined', 'leadership'], 3),
+        ("recent_news", ['news', 'announcement', 'press release', 'update'], 3),
+    ):
+        snippets = list(dict.fromkeys(line for line in lines if any(word in line.lower() for word in keywords)))
+        info[field] = ' '.join(snippets[:limit])
+    for field, keyword in (("strengths", 'strength'), ("weaknesses", 'weakness'),
+                           ("opportunities", 'opportunit'), ("threats", 'threat')):
+        snippets = list(dict.fromkeys(line for line in lines if keyword in line.lower()))
+        info[field] = ' '.join(snippets) if snippets else "Not Available"
+    return info
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    links = ["Careers", "SAP Basis Administrator", "ERP Analyst", "Contact"] * 50
+    print(f"{'page size':>12} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for sentences in (200, 2000, 20000):
+        text = make_page(sentences)
+        legacy_time, legacy = best_of(lambda: legacy_extract({}, text, links), 5)
+        new_time, new = best_of(lambda: extract_company_info({}, text, links), 5)
+        assert legacy == new, "single-pass extraction diverged from the legacy output"
+        print(f"{len(text) // 1024:>9} KiB {legacy_time * 1000:>10.2f} {new_time * 1000:>15.2f} {legacy_time / new_time:>7.1f}x")
+
+    assert extract_company_info({}, REPEATED_PAGE)["leadership_changes"] == REPEATED_LEADERSHIP, \
+        "repeated sentences crowded out a distinct match"
+    print("repeated boilerplate:")
+    for sentences in (200, 2000, 20000):
+        text = make_boilerplate_page(sentences)
+        legacy_time, legacy = best_of(lambda: deduplicated_legacy(text, links), 5)
+        new_time, new = best_of(lambda: extract_company_info({}, text, links), 5)
+        assert legacy == new, "single-pass extraction diverged from the deduplicated legacy output"
+        print(f"{len(text) // 1024:>9} KiB {legacy_time * 1000:>10.2f} {new_time * 1000:>15.2f} {legacy_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: parse time and peak memory per page for each parsing strategy.
+
+Compares a full html.parser tree (the old behaviour), a full lxml tree and
+lxml restricted to the subtrees the caller needs.
+
+Run from the repository root:
+    python -m benchmarks.bench_parsing
+"""
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from parsing import ANCHORS, SEARCH_RESULTS
+
+
+def make_serp(results=10, padding_blocks=400):
+    padding = "".join(
+        f'<div class="pad"><span>Related search {i}</span><script>var x{i} = "{"y" * 200}";</script></div>'
+        for i in range(padding_blocks)
+    )
+    hits = "".join(
+        f'<div class="g tF2Cxc"><a href="https://example{i}.com/"><h3>Result {i}</h3></a><span>Snippet {i}</span></div>'
+        for i in range(results)
+    )
+    return f"<html><head><style>{'.c{color:red}' * 2000}</style></head><body>{padding}{hits}</body></html>"
+
+
+def make_homepage(sections=300):
+    body = "".join(
+        f'<section><h2>Section {i}</h2><p>We build products for customers worldwide. '
+        f'<a href="/about#{i}">About</a> <a href="/careers/{i}">SAP Analyst {i}</a></p></section>'
+        for i in range(sections)
+    )
+    return f"<html><body><nav>{'<a href=/x>Nav</a>' * 100}</nav>{body}</body></html>"
+
+
+def measure(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    cases = [
+        ("search page", make_serp(), SEARCH_RESULTS),
+        ("anchor scan", make_homepage(), ANCHORS),
+    ]
+    print(f"{'page':<12} {'strategy':<24} {'ms':>8} {'peak KiB':>10}")
+    for name, markup, strainer in cases:
+        strategies = [
+            ("html.parser full tree", lambda: BeautifulSoup(markup, "html.parser")),
+            ("lxml full tree", lambda: BeautifulSoup(markup, "lxml")),
+            ("lxml targeted subtrees", lambda: BeautifulSoup(markup, "lxml", parse_only=strainer)),
+        ]
+        print(f"{name} ({len(markup) // 1024} KiB)")
+        for label, func in strategies:
+            ms, peak_kib = measure(func)
+            print(f"{'':<12} {label:<24} {ms:>8.2f} {peak_kib:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
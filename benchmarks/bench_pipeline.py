@@ -0,0 +1,145 @@
+"""Benchmark: end-to-end research latency per stage, fully offline.
+
+Starts the stand-ins from benchmarks/stubs.py and points the pipeline at them.
+Google is replaced through GOOGLE_SEARCH_URL, Azure OpenAI through
+AZURE_OPENAI_ENDPOINT, and the third-party search tools are switched off.
+Each iteration researches a new company through google_search,
+scrape_company_website, generate_summary and fill_word_template;
+--report-mode sections generates the report section by section and --refine
+also refines the scraped fields on the Groq route, served by the same stub.
+
+p50/p95/p99 per stage are printed and one JSON line per run, tagged with the
+current commit, is appended to --out so results can be compared across commits.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --iterations 30 --latency 0.3 --tokens-per-second 150
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from benchmarks.stubs import StubServer
+from metrics import percentile
+
+STAGES = ["google_search", "scrape_company_website", "generate_summary", "fill_word_template", "total"]
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def configure_environment(stub, refine=False):
+    os.environ["GOOGLE_SEARCH_URL"] = stub.search_url
+    os.environ["ENRICHMENT_SOURCES"] = ""
+    os.environ["AZURE_OPENAI_ENDPOINT"] = stub.openai_endpoint
+    os.environ["AZURE_OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_API_VERSION"] = "2024-06-01"
+    os.environ["LLM_REFINE"] = "1" if refine else "0"
+    if refine:
+        os.environ["GROQ_API_KEY"] = "benchmark"
+        os.environ["GROQ_API_BASE"] = stub.base_url
+    # Fresh caches, so every iteration really calls the stub model
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.environ.pop("LLM_CACHE_DIR", None)
+
+
+def run(iterations, stub):
+    # Imported only now: these modules read their settings at import time
+    from fill_template import fill_word_template
+    from scraper import google_search, scrape_company_website
+    from summary import SUMMARY_FAILED, generate_summary
+
+    timings = {stage: [] for stage in STAGES}
+    for i in range(iterations):
+        company = f"Benchmark Company {i}"
+        started = time.perf_counter()
+
+        stage_started = time.perf_counter()
+        website = google_search(f"{company} official site")
+        timings["google_search"].append(time.perf_counter() - stage_started)
+        assert website and website.startswith(stub.base_url), website
+
+        stage_started = time.perf_counter()
+        company_info = scrape_company_website(company)
+        timings["scrape_company_website"].append(time.perf_counter() - stage_started)
+
+        stage_started = time.perf_counter()
+        report = generate_summary(company, company_info)
+        timings["generate_summary"].append(time.perf_counter() - stage_started)
+        assert report != SUMMARY_FAILED, "the stub model call failed"
+
+        stage_started = time.perf_counter()
+        fill_word_template("ModelTemplate.docx", report)
+        timings["fill_word_template"].append(time.perf_counter() - stage_started)
+
+        timings["total"].append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub model token rate")
+    parser.add_argument("--tokens-per-section", type=int, default=60, help="stub completion tokens per report section")
+    parser.add_argument("--report-mode", choices=("single", "sections"), default="single")
+    parser.add_argument("--refine", action="store_true", help="refine scraped fields on the extraction route")
+    parser.add_argument("--out", default=os.path.join("data", "benchmarks", "pipeline.jsonl"))
+    args = parser.parse_args()
+
+    with StubServer(args.latency, args.tokens_per_second, args.tokens_per_section) as stub:
+        configure_environment(stub, args.refine)
+        os.environ["REPORT_MODE"] = args.report_mode
+        timings = run(args.iterations, stub)
+        from http_client import connection_stats
+        from model_router import route_stats
+        from parsing import parse_stats
+        from rate_limiter import rate_stats
+        routes, queues, connections = route_stats(), rate_stats(), connection_stats()
+        # The per-page records stay out of the results file
+        parsing = {name: value for name, value in parse_stats().items() if name != "recent"}
+
+    stages = {}
+    print(f"{'stage':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in STAGES:
+        stats = {f"p{pct}_ms": round(percentile(timings[stage], pct) * 1000, 2) for pct in (50, 95, 99)}
+        stages[stage] = stats
+        print(f"{stage:<24} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    for route, stats in routes.items():
+        print(f"{route:<24} {stats['calls']} calls, p50 {stats['latency_p50'] * 1000:.1f} ms, ${stats['cost_usd']:.4f}")
+    for provider, stats in queues.items():
+        print(f"{provider + ' queue':<24} p50 wait {stats['wait_p50'] * 1000:.1f} ms, p95 wait {stats['wait_p95'] * 1000:.1f} ms")
+    print(f"{'connections':<24} {connections['requests']} requests, {connections['connections_opened']} opened, "
+          f"{connections['reuse_ratio']:.0%} reused")
+    print(f"{'html parsing':<24} {parsing['pages']} pages, avg {parsing['avg_ms']:.1f} ms, max {parsing['max_ms']:.1f} ms")
+
+    record = {
+        "benchmark": "pipeline",
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "iterations": args.iterations,
+        "report_mode": args.report_mode,
+        "refine": args.refine,
+        "stub": {"latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                 "tokens_per_section": args.tokens_per_section},
+        "stages": stages,
+        "routes": routes,
+        "rate_limits": queues,
+        "connections": connections,
+        "parsing": parsing,
+    }
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
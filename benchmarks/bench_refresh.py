@@ -0,0 +1,112 @@
+"""Benchmark: what refreshing stale reports costs when the company sites did or did not change.
+
+Starts the stand-ins from benchmarks/stubs.py (whose site pages send ETags
+and answer conditional requests with 304) and runs research jobs through a
+JobQueue whose reports go stale at once, in three passes over the same
+companies:
+
+    initial      first research, every page downloaded and the full report written
+    unchanged    refresh with no site changes: pages come back 304, no completions
+    one change   refresh after one page per company changed: only the sections
+                 whose fields changed are rewritten
+
+The LLM response cache and the shared cache are switched off, so every
+completion saved is saved by the incremental refresh itself. With --refine
+the field refinement tasks (refinement.py) run too, on the stub's Groq
+stand-in; their answers are only reused through the LLM response cache, so
+it stays on for that run (report prompts never repeat across the passes, so
+the report completions are the same either way).
+
+Prints completions, page downloads, 304s and wall time per pass and appends
+one JSON line per run, tagged with the current commit, to --out.
+
+Run from the repository root:
+    python -m benchmarks.bench_refresh --companies 5 --report-mode sections
+    python -m benchmarks.bench_refresh --refine
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.bench_pipeline import configure_environment, current_commit
+from benchmarks.stubs import StubServer, company_slug
+
+CHANGED_PAGE = ("investors", "Another opportunity is the growing demand for cloud services.")
+
+
+def run_pass(queue, companies, stub):
+    from jobs import DONE, FAILED
+
+    before = (stub.completions, stub.page_requests, stub.not_modified)
+    started = time.perf_counter()
+    job_ids = [queue.submit(company, owner="benchmark") for company in companies]
+    while True:
+        jobs = [queue.get(job_id) for job_id in job_ids]
+        if all(job["status"] in (DONE, FAILED) for job in jobs):
+            break
+        time.sleep(0.05)
+    completions, page_requests, not_modified = (now - then for now, then in zip(
+        (stub.completions, stub.page_requests, stub.not_modified), before))
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "failed": [job["error"] for job in jobs if job["status"] == FAILED],
+        "completions": completions,
+        "pages_downloaded": page_requests - not_modified,
+        "not_modified": not_modified,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental refresh benchmark.")
+    parser.add_argument("--companies", type=int, default=4)
+    parser.add_argument("--report-mode", choices=("single", "sections"), default="single")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub model token rate")
+    parser.add_argument("--refine", action="store_true", help="also run the LLM field refinement tasks")
+    parser.add_argument("--out", default=os.path.join("data", "benchmarks", "refresh.jsonl"))
+    args = parser.parse_args()
+
+    with StubServer(args.latency, args.tokens_per_second) as stub:
+        configure_environment(stub, refine=args.refine)
+        os.environ.update(REPORT_MODE=args.report_mode, SHARED_CACHE_URL="")
+        if not args.refine:
+            os.environ.update(LLM_CACHE_MEMORY_MB="0", LLM_CACHE_DISK_MB="0")
+        from jobs import JobQueue
+        from report_store import ReportStore
+
+        # Every report is stale as soon as it is saved, so each pass refreshes
+        queue = JobQueue(ReportStore(ttl_hours=0))
+        companies = [f"Refresh Company {i}" for i in range(args.companies)]
+        passes = {"initial": run_pass(queue, companies, stub)}
+        passes["unchanged"] = run_pass(queue, companies, stub)
+        for company in companies:
+            stub.page_edits[(company_slug(company), CHANGED_PAGE[0])] = CHANGED_PAGE[1]
+        passes["one change"] = run_pass(queue, companies, stub)
+        queue.close()
+
+    print(f"{'pass':<12} {'completions':>12} {'downloads':>10} {'304s':>6} {'seconds':>8}")
+    for name, result in passes.items():
+        print(f"{name:<12} {result['completions']:>12} {result['pages_downloaded']:>10} "
+              f"{result['not_modified']:>6} {result['seconds']:>8.2f}"
+              + (f"  ({len(result['failed'])} failed)" if result["failed"] else ""))
+
+    record = {
+        "benchmark": "refresh",
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "companies": args.companies,
+        "report_mode": args.report_mode,
+        "refine": args.refine,
+        "stub": {"latency": args.latency, "tokens_per_second": args.tokens_per_second},
+        "passes": passes,
+    }
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: latency of a Streamlit rerun triggered by a sidebar click in app.py.
+
+Drives the real page script with Streamlit's AppTest harness. Each sidebar
+click is timed twice: with every shared resource dropped before the rerun
+(what happened when the script rebuilt its clients and assets each time)
+and with the process-wide cached resources. Placeholder API keys are set so
+the clients can be constructed; nothing is sent over the network.
+
+Run from the repository root:
+    python -m benchmarks.bench_rerun
+"""
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://localhost")
+os.environ.setdefault("OPENAI_API_VERSION", "2024-06-01")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("SERPAPI_API_KEY", "benchmark")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bench_rerun_")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from metrics import percentile  # noqa: E402
+from resources import release_resources, report_store  # noqa: E402
+
+COMPANIES = ["Acme Corp", "Globex", "Initech"]
+
+
+def click_through(app, clicks, rebuild):
+    timings = []
+    for i in range(clicks):
+        if rebuild:
+            release_resources()
+        started = time.perf_counter()
+        app.sidebar.radio[0].set_value(COMPANIES[i % len(COMPANIES)]).run()
+        timings.append((time.perf_counter() - started) * 1000)
+        assert not app.exception, app.exception
+    return timings
+
+
+def main(clicks=30):
+    store = report_store()
+    for company in COMPANIES:
+        store.put(company, f"Report for {company}. " * 200)
+
+    app = AppTest.from_file("app.py", default_timeout=120)
+    started = time.perf_counter()
+    app.run()
+    print(f"first run (builds everything): {(time.perf_counter() - started) * 1000:.0f} ms")
+    app.session_state["search_history"] = list(COMPANIES)
+    app.run()
+
+    print(f"{'resources':<26} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, rebuild in (("rebuilt on every rerun", True), ("cached per process", False)):
+        timings = click_through(app, clicks, rebuild)
+        print(f"{label:<26} {statistics.median(timings):>8.1f} {percentile(timings, 95):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
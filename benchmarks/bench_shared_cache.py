@@ -0,0 +1,113 @@
+"""Benchmark: several app instances researching the same companies through the shared cache.
+
+Starts the stand-ins from benchmarks/stubs.py, including the Redis stand-in,
+then launches --instances processes that each run their own job queue and
+local databases, sharing only SHARED_CACHE_URL. Every instance submits the
+same companies at the same time. With a shared backend each company should
+be researched once across all instances (the others wait on its lease and
+pick the report up from the shared cache); --backend none shows the cost of
+every instance doing the work itself.
+
+Prints the model completions per company, wall time and per-instance
+shared-cache hits, and appends one JSON line per run, tagged with the
+current commit, to --out.
+
+Run from the repository root:
+    python -m benchmarks.bench_shared_cache --instances 3 --companies 5 --backend redis
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import configure_environment, current_commit
+from benchmarks.stubs import RespServer, StubServer
+
+
+def run_instance(companies):
+    """One app instance: submits every company to its own job queue and waits for the jobs."""
+    from jobs import DONE, FAILED, JobQueue
+    from report_store import ReportStore
+    from search import research_search, site_search
+    from singleflight import coalescing_stats
+
+    started = time.perf_counter()
+    report_store = ReportStore()
+    queue = JobQueue(report_store)
+    job_ids = [queue.submit(f"Shared Company {i}", owner="benchmark") for i in range(companies)]
+    while True:
+        jobs = [queue.get(job_id) for job_id in job_ids]
+        if all(job["status"] in (DONE, FAILED) for job in jobs):
+            break
+        time.sleep(0.05)
+    queue.close()
+    print(json.dumps({
+        "elapsed": time.perf_counter() - started,
+        "done": sum(job["status"] == DONE for job in jobs),
+        "failed": [job["error"] for job in jobs if job["status"] == FAILED],
+        "site_search": site_search.stats(),
+        "research_search": research_search.stats(),
+        "coalescing": coalescing_stats(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-instance shared cache benchmark.")
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--companies", type=int, default=4)
+    parser.add_argument("--backend", choices=("redis", "sqlite", "none"), default="redis")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub model token rate")
+    parser.add_argument("--instance", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", default=os.path.join("data", "benchmarks", "shared_cache.jsonl"))
+    args = parser.parse_args()
+
+    if args.instance:
+        run_instance(args.companies)
+        return
+
+    with StubServer(args.latency, args.tokens_per_second) as stub, RespServer() as resp:
+        configure_environment(stub)
+        root = os.environ["DATA_DIR"]
+        shared_url = {"redis": resp.url, "sqlite": "sqlite:///" + os.path.join(root, "shared.db"), "none": ""}[args.backend]
+        started = time.perf_counter()
+        processes = []
+        for i in range(args.instances):
+            env = {**os.environ, "DATA_DIR": tempfile.mkdtemp(prefix=f"instance{i}_", dir=root),
+                   "SHARED_CACHE_URL": shared_url, "LOCK_POLL_SECONDS": "0.1"}
+            command = [sys.executable, "-m", "benchmarks.bench_shared_cache", "--instance", "--companies", str(args.companies)]
+            processes.append(subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True))
+        instances = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+        elapsed = time.perf_counter() - started
+        completions = stub.completions
+
+    print(f"{args.instances} instances x {args.companies} companies, backend {args.backend}: "
+          f"{completions} model completions ({completions / args.companies:.1f} per company) in {elapsed:.2f} s")
+    for i, instance in enumerate(instances):
+        print(f"instance {i}: {instance['done']} done, {len(instance['failed'])} failed, "
+              f"shared search hits {instance['site_search']['shared_hits']}, {instance['elapsed']:.2f} s")
+
+    record = {
+        "benchmark": "shared_cache",
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "instances": args.instances,
+        "companies": args.companies,
+        "backend": args.backend,
+        "stub": {"latency": args.latency, "tokens_per_second": args.tokens_per_second},
+        "completions": completions,
+        "elapsed": elapsed,
+        "per_instance": instances,
+    }
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
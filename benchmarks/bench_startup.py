@@ -0,0 +1,71 @@
+"""Benchmark: cold start time of each entry point, with a per-module import breakdown.
+
+Every entry point is executed in a fresh interpreter under `python -X importtime`
+with the background warm-up disabled, so only the work on the startup path is
+counted. The slowest top-level imports are listed and the run exits non-zero
+when any entry point takes longer than STARTUP_BUDGET_SECONDS.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [entry.py ...]
+"""
+import os
+import subprocess
+import sys
+import time
+
+from config import STARTUP_BUDGET_SECONDS
+
+ENTRY_POINTS = ["app.py", "app-main.py", "batch.py"]
+TOP_MODULES = 10
+
+# Placeholders so the clients built at import can be constructed; nothing is sent
+PLACEHOLDER_ENV = {
+    "AZURE_OPENAI_API_KEY": "benchmark",
+    "AZURE_OPENAI_ENDPOINT": "http://localhost",
+    "OPENAI_API_VERSION": "2024-06-01",
+    "TAVILY_API_KEY": "benchmark",
+    "SERPAPI_API_KEY": "benchmark",
+}
+
+
+def top_level_imports(importtime_output):
+    """Cumulative microseconds per module imported directly by the entry point."""
+    modules = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented below their parent
+        if not name[1:].startswith(" "):
+            modules[name.strip()] = modules.get(name.strip(), 0) + int(cumulative)
+    return modules
+
+
+def cold_start(entry_point):
+    env = {**PLACEHOLDER_ENV, **os.environ, "WARM_UP": "0"}
+    code = f"import runpy; runpy.run_path({entry_point!r}, run_name='__startup__')"
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{entry_point} failed to start:\n{result.stderr[-2000:]}")
+    return elapsed, top_level_imports(result.stderr)
+
+
+def main(entry_points=None):
+    over_budget = []
+    for entry_point in entry_points or ENTRY_POINTS:
+        elapsed, modules = cold_start(entry_point)
+        print(f"{entry_point}: {elapsed:.2f}s cold start (budget {STARTUP_BUDGET_SECONDS:.2f}s)")
+        for name, micros in sorted(modules.items(), key=lambda item: -item[1])[:TOP_MODULES]:
+            print(f"  {micros / 1000:>8.1f} ms  {name}")
+        if elapsed > STARTUP_BUDGET_SECONDS:
+            over_budget.append(entry_point)
+
+    if over_budget:
+        print(f"Over the startup budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,346 @@
+"""Local stand-ins for Google, company websites, the Azure OpenAI chat endpoint and Redis.
+
+StubServer serves, on one loopback port:
+    /search?q=...                          a canned Google results page (tF2Cxc blocks)
+    /sites/<slug>/ and its subpages        a synthetic company website, with ETags (304 on a match)
+    /sitemap.xml                           an empty sitemap
+    .../chat/completions (POST)            a fake chat completion, streamed or not
+
+The chat endpoint waits `latency` seconds before the first token and then
+emits tokens at `tokens_per_second`: the heading and `tokens_per_section`
+tokens for every report section ("## " heading) the prompt asks for, so a
+whole-report prompt gets a proportionally longer answer than a single-section
+one. Each completion starts with a digest of the prompt, so different prompts
+get different reports.
+
+Site pages can be edited through `page_edits[(slug, page)]`, text appended to
+that page, to simulate a company site changing between two crawls.
+
+RespServer speaks enough of the Redis protocol for the shared cache backend:
+PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, PEXPIRE and
+WATCH/UNWATCH/MULTI/EXEC/DISCARD.
+"""
+import hashlib
+import json
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SUBPAGES = ("about", "investors", "leadership", "careers", "contact", "news")
+
+
+def company_slug(company_name):
+    return re.sub(r"[^a-z0-9]+", "-", company_name.lower()).strip("-") or "company"
+
+
+def serp_html(base_url, query, results=10):
+    slug = company_slug(re.sub(r"\bofficial site\b", "", query))
+    hits = [f"{base_url}/sites/{slug}/"] + [f"{base_url}/sites/{slug}-directory-{i}/" for i in range(1, results)]
+    blocks = "".join(
+        f'<div class="g tF2Cxc"><div class="yuRUbf"><a href="{url}"><h3>Result {i} for {query}</h3></a></div>'
+        f'<div class="VwiC3b">Snippet {i} about {query}.</div></div>'
+        for i, url in enumerate(hits)
+    )
+    padding = "".join(f'<div class="related"><span>People also search for {query} {i}</span></div>' for i in range(60))
+    scripts = f"<script>var data = \"{'x' * 4000}\";</script>" * 20
+    return f"<html><head><title>{query} - Google Search</title>{scripts}</head><body>{padding}<div id=\"search\">{blocks}</div></body></html>"
+
+
+def site_html(slug, page="home", extra=""):
+    name = slug.replace("-", " ").title()
+    nav = "".join(f'<a href="/sites/{slug}/{sub}">{sub.title()}</a> ' for sub in SUBPAGES)
+    bodies = {
+        "home": f"{name} builds industrial software for customers in over forty countries. "
+                f"Read the latest news and press release archive. Our core strength is a loyal customer base.",
+        "about": f"{name} has 12,500 employees worldwide. Annual revenue reached $4.2 billion. "
+                 f"SIC Code: 7372. We run SAP S/4HANA across all plants.",
+        "investors": f"The company raised $300 million in its latest funding round. "
+                     f"A weakness is our dependence on a few suppliers. Supply chain disruption remains a threat.",
+        "leadership": "Jane Doe was appointed CEO of the group. John Roe joined the leadership team as CFO.",
+        "careers": '<a href="/sites/{0}/careers/1">SAP Basis Administrator</a> <a href="/sites/{0}/careers/2">ERP Analyst</a>'.format(slug),
+        "contact": "Visit us at 1 Main Street, Springfield, IL 62701. Call +1 217-555-0100.",
+        "news": "We see an opportunity in emerging markets. Announcement: a new plant opens next year.",
+    }
+    body = bodies.get(page, bodies["home"]) + (f" {extra}" if extra else "")
+    filler = "".join(f"<p>{name} section {i}: products, services and customer stories.</p>" for i in range(80))
+    return f"<html><head><title>{name}</title></head><body><nav>{nav}</nav><main><p>{body}</p>{filler}</main></body></html>"
+
+
+def completion_tokens(prompt, tokens_per_section):
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    words = [f"Report {digest}."]
+    for heading in re.findall(r"^## .+$", prompt, re.M) or [""]:
+        if heading:
+            words.append(f"\n\n{heading}\n")
+        words += [f"word{i % 97}" for i in range(tokens_per_section - 1)]
+    return [f"{word} " for word in words]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_page(self, body, content_type="text/html; charset=utf-8"):
+        """Sends a site page with an ETag, or 304 Not Modified when the client already has it."""
+        etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:16] + '"'
+        stub = self.server.stub
+        with stub.lock:
+            stub.page_requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            with stub.lock:
+                stub.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, body, content_type, headers=[("ETag", etag)])
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if url.path == "/search":
+            query = parse_qs(url.query).get("q", [""])[0]
+            self._send(200, serp_html(self.server.base_url, query))
+        elif url.path == "/sitemap.xml":
+            self._send_page('<?xml version="1.0" encoding="UTF-8"?><urlset></urlset>', "application/xml")
+        elif len(parts) >= 2 and parts[0] == "sites":
+            page = parts[2] if len(parts) > 2 else "home"
+            self._send_page(site_html(parts[1], page, self.server.stub.page_edits.get((parts[1], page), "")))
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self._send(404, "not found")
+            return
+        stub = self.server.stub
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        tokens = completion_tokens(prompt, stub.tokens_per_section)
+        with stub.lock:
+            stub.completions += 1
+        time.sleep(stub.latency)
+        if body.get("stream"):
+            self._stream(tokens, stub.tokens_per_second)
+        else:
+            time.sleep(len(tokens) / stub.tokens_per_second)
+            self._send(200, json.dumps(self._completion(body, "".join(tokens), len(prompt) // 4, len(tokens))), "application/json")
+
+    def _completion(self, request, text, prompt_tokens, completion_tokens):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or "gpt-4o",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _stream(self, tokens, tokens_per_second):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(1 / tokens_per_second)
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o",
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        done = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.close_connection = True
+
+
+class StubServer:
+    """Runs the stand-in endpoints on 127.0.0.1 in a background thread.
+
+    Use as a context manager; .base_url is the server root, .search_url the
+    Google replacement and .openai_endpoint the Azure OpenAI endpoint.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=200.0, tokens_per_section=60):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_section = tokens_per_section
+        self.completions = 0
+        self.page_requests = 0
+        self.not_modified = 0
+        self.page_edits = {}
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._server.base_url = self.base_url
+        self.search_url = f"{self.base_url}/search"
+        self.openai_endpoint = self.base_url
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# EXEC's reply when a watched key changed
+_NULL_ARRAY = object()
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def _encode(self, reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return f"-ERR {reply}\r\n".encode()
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return f"${len(reply)}\r\n".encode() + reply + b"\r\n"
+        if reply is _NULL_ARRAY:
+            return b"*-1\r\n"
+        return f"*{len(reply)}\r\n".encode() + b"".join(self._encode(item) for item in reply)
+
+    def handle(self):
+        store = self.server.store
+        watched, queued = {}, None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            if name == "MULTI":
+                queued, reply = [], "OK"
+            elif name == "DISCARD":
+                queued, watched, reply = None, {}, "OK"
+            elif name == "EXEC":
+                with store.lock:
+                    if any(store.version(key) != version for key, version in watched.items()):
+                        reply = _NULL_ARRAY
+                    else:
+                        reply = [store.execute(command) for command in queued or ()]
+                queued, watched = None, {}
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            elif name == "WATCH":
+                with store.lock:
+                    watched.update((key, store.version(key)) for key in args[1:])
+                reply = "OK"
+            elif name == "UNWATCH":
+                watched, reply = {}, "OK"
+            else:
+                with store.lock:
+                    reply = store.execute(args)
+            self.wfile.write(self._encode(reply))
+
+
+class _RespStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.versions = {}
+        self.commands = 0
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            self._touch(key)
+            entry = None
+        return entry
+
+    def version(self, key):
+        self._live(key)
+        return self.versions.get(key, 0)
+
+    def execute(self, args):
+        self.commands += 1
+        name = args[0].decode().upper()
+        if name in ("PING", "AUTH", "SELECT"):
+            return "PONG" if name == "PING" else "OK"
+        key = args[1]
+        entry = self._live(key)
+        if name == "GET":
+            return entry[0] if entry else None
+        if name == "DEL":
+            if entry is None:
+                return 0
+            del self.data[key]
+            self._touch(key)
+            return 1
+        if name == "PEXPIRE":
+            if entry is None:
+                return 0
+            self.data[key] = (entry[0], time.monotonic() + int(args[2]) / 1000)
+            self._touch(key)
+            return 1
+        if name == "SET":
+            options = [arg.decode().upper() for arg in args[3:]]
+            if ("NX" in options and entry is not None) or ("XX" in options and entry is None):
+                return None
+            expires_at = None
+            for unit, scale in (("EX", 1), ("PX", 1000)):
+                if unit in options:
+                    expires_at = time.monotonic() + int(options[options.index(unit) + 1]) / scale
+            self.data[key] = (args[2], expires_at)
+            self._touch(key)
+            return "OK"
+        return ValueError(f"unknown command '{name}'")
+
+
+class RespServer:
+    """Runs the Redis stand-in on 127.0.0.1 in a background thread; .url is its redis:// URL."""
+
+    def __init__(self):
+        self.store = _RespStore()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RespHandler)
+        self._server.daemon_threads = True
+        self._server.store = self.store
+        self.url = f"redis://127.0.0.1:{self._server.server_address[1]}/0"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="resp-server", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,133 @@
+import os
+from dotenv import load_dotenv
+
+# -------------------------
+# Load environment variables from .env file before any module reads its settings
+load_dotenv()
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+# Report store
+REPORT_DB_PATH = os.getenv("REPORT_DB_PATH", os.path.join(DATA_DIR, "reports.db"))
+REPORT_TTL_HOURS = float(os.getenv("REPORT_TTL_HOURS", "24"))
+REPORT_HISTORY_LIMIT = int(os.getenv("REPORT_HISTORY_LIMIT", "10"))
+# Company name variants and the canonical entity (and official site) each resolves to
+ALIAS_DB_PATH = os.getenv("ALIAS_DB_PATH", REPORT_DB_PATH)
+
+# Cache and lock backend shared by every instance: sqlite:///<path> (instances sharing a
+# filesystem), redis://[:password@]host:port/db, or empty for per-process caches only
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "sqlite:///" + os.path.join(DATA_DIR, "shared_cache.db"))
+SHARED_PAGE_TTL_SECONDS = float(os.getenv("SHARED_PAGE_TTL_SECONDS", "3600"))
+# A node researching a company holds a lease on it, renewed while it works
+LOCK_LEASE_SECONDS = float(os.getenv("LOCK_LEASE_SECONDS", "60"))
+LOCK_WAIT_SECONDS = float(os.getenv("LOCK_WAIT_SECONDS", "300"))
+LOCK_POLL_SECONDS = float(os.getenv("LOCK_POLL_SECONDS", "1"))
+
+# Background research jobs: worker threads per process, UI poll interval and how long finished jobs are kept
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", REPORT_DB_PATH)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+# Acquisition
+ACQUISITION_TIMEOUT = float(os.getenv("ACQUISITION_TIMEOUT", "20"))
+ACQUISITION_WORKERS = int(os.getenv("ACQUISITION_WORKERS", "16"))
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.google.com/search")
+# Comma-separated subset of search.ENRICHMENT_PROVIDERS, in preference order; empty disables web research
+ENRICHMENT_SOURCES = [name.strip() for name in os.getenv("ENRICHMENT_SOURCES", "tavily,duckduckgo,serpapi").split(",") if name.strip()]
+# Official-site lookup providers in preference order (search.SITE_PROVIDERS)
+SITE_SEARCH_PROVIDERS = [name.strip() for name in os.getenv("SITE_SEARCH_PROVIDERS", "google,tavily,serpapi").split(",") if name.strip()]
+
+# Hedged search: the next provider is started once the current one is slower than
+# SEARCH_HEDGE_PERCENTILE of its recent latencies (SEARCH_HEDGE_DELAY until it has samples)
+SEARCH_HEDGE_PERCENTILE = float(os.getenv("SEARCH_HEDGE_PERCENTILE", "90"))
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "2.0"))
+SEARCH_HEDGE_MIN_DELAY = float(os.getenv("SEARCH_HEDGE_MIN_DELAY", "0.2"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "15"))
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "6"))
+SEARCH_CACHE_ENTRIES = int(os.getenv("SEARCH_CACHE_ENTRIES", "2048"))
+
+# Site crawler
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "8"))
+CRAWL_MAX_BYTES = int(os.getenv("CRAWL_MAX_BYTES", str(4 * 1024 * 1024)))
+CRAWL_PER_DOMAIN = int(os.getenv("CRAWL_PER_DOMAIN", "4"))
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "16"))
+
+# Shared HTTP client
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+# Validators (ETag, Last-Modified) and bodies of crawled pages, for conditional GETs on refresh
+PAGE_DB_PATH = os.getenv("PAGE_DB_PATH", os.path.join(DATA_DIR, "pages.db"))
+PAGE_RETENTION_DAYS = float(os.getenv("PAGE_RETENTION_DAYS", "30"))
+
+# HTML parsing
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+PARSE_PROFILE_MEMORY = os.getenv("PARSE_PROFILE_MEMORY", "").lower() in ("1", "true", "yes")
+
+# LLM response cache
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(DATA_DIR, "llm_cache"))
+LLM_CACHE_MEMORY_MB = float(os.getenv("LLM_CACHE_MEMORY_MB", "32"))
+LLM_CACHE_DISK_MB = float(os.getenv("LLM_CACHE_DISK_MB", "512"))
+
+# Prompt budget
+PROMPT_INPUT_TOKEN_BUDGET = int(os.getenv("PROMPT_INPUT_TOKEN_BUDGET", "2500"))
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+
+# Report generation: "single" completion, or "sections" generated concurrently and merged in template order
+REPORT_MODE = os.getenv("REPORT_MODE", "single")
+SECTION_WORKERS = int(os.getenv("SECTION_WORKERS", "10"))
+SECTION_RETRIES = int(os.getenv("SECTION_RETRIES", "2"))
+SECTION_RETRY_BACKOFF = float(os.getenv("SECTION_RETRY_BACKOFF", "1.0"))
+SECTION_RESEARCH_TOKENS = int(os.getenv("SECTION_RESEARCH_TOKENS", "400"))
+
+# Model routing: providers tried in order per route; the next one takes over when one
+# times out or is rate limited. "extraction" serves the cheap structured tasks in
+# refinement.py, "synthesis" the final report.
+ROUTE_PROVIDERS = {
+    "extraction": [name.strip() for name in os.getenv("ROUTE_EXTRACTION", "groq,azure").split(",") if name.strip()],
+    "synthesis": [name.strip() for name in os.getenv("ROUTE_SYNTHESIS", "azure,groq").split(",") if name.strip()],
+}
+ROUTE_TIMEOUTS = {
+    "extraction": float(os.getenv("EXTRACTION_TIMEOUT", "10")),
+    "synthesis": float(os.getenv("SYNTHESIS_TIMEOUT", "60")),
+}
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+AZURE_DEPLOYMENT = os.getenv("AZURE_DEPLOYMENT", "gpt-4o")
+AZURE_MODEL = os.getenv("AZURE_MODEL", "gpt-4o")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# USD per million input and output tokens, for the per-route cost figures
+AZURE_PRICE = (float(os.getenv("AZURE_INPUT_PRICE", "2.50")), float(os.getenv("AZURE_OUTPUT_PRICE", "10.00")))
+GROQ_PRICE = (float(os.getenv("GROQ_INPUT_PRICE", "0.05")), float(os.getenv("GROQ_OUTPUT_PRICE", "0.08")))
+# Refine scraped fields on the extraction route; on by default once a Groq key is set
+LLM_REFINE = os.getenv("LLM_REFINE", "1" if os.getenv("GROQ_API_KEY") else "0").lower() not in ("0", "false", "no")
+
+# Outbound rate limits per provider, shared by every session in the process; 0 disables a limit.
+# Buckets hold RATE_LIMIT_BURST_SECONDS worth of requests/tokens; an LLM call reserves its
+# prompt tokens plus RATE_LIMIT_OUTPUT_TOKENS and settles with the real usage afterwards.
+RATE_LIMITS = {
+    "azure": {"rpm": float(os.getenv("AZURE_RPM", "300")), "tpm": float(os.getenv("AZURE_TPM", "50000"))},
+    "groq": {"rpm": float(os.getenv("GROQ_RPM", "30")), "tpm": float(os.getenv("GROQ_TPM", "6000"))},
+    "google": {"rpm": float(os.getenv("GOOGLE_RPM", "60")), "tpm": 0},
+    "tavily": {"rpm": float(os.getenv("TAVILY_RPM", "100")), "tpm": 0},
+    "serpapi": {"rpm": float(os.getenv("SERPAPI_RPM", "60")), "tpm": 0},
+    "duckduckgo": {"rpm": float(os.getenv("DUCKDUCKGO_RPM", "30")), "tpm": 0},
+}
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv("RATE_LIMIT_OUTPUT_TOKENS", "600"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+
+# Word export
+DOCX_CACHE_ENTRIES = int(os.getenv("DOCX_CACHE_ENTRIES", "64"))
+
+# Request log: one JSON line of timed spans per research request; empty path disables it
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", os.path.join(DATA_DIR, "logs", "requests.jsonl"))
+REQUEST_LOG_MAX_MB = float(os.getenv("REQUEST_LOG_MAX_MB", "20"))
+REQUEST_LOG_BACKUPS = int(os.getenv("REQUEST_LOG_BACKUPS", "5"))
+
+# Startup
+WARM_UP = os.getenv("WARM_UP", "1").lower() not in ("0", "false", "no")
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "4"))
@@ -0,0 +1,165 @@
+import asyncio
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import http_client
+from config import CRAWL_MAX_BYTES, CRAWL_MAX_PAGES, CRAWL_PER_DOMAIN, CRAWL_WORKERS, FETCH_MAX_BYTES
+from parsing import parse_html
+from tracing import in_current_context
+
+# Pages that usually carry revenue, address, executive or hiring data, best first
+HIGH_VALUE_KEYWORDS = [
+    "investor", "about", "leadership", "management", "team", "contact",
+    "careers", "jobs", "company", "news", "press",
+]
+
+SKIPPED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".mp4", ".webp", ".css", ".js")
+
+_executor = ThreadPoolExecutor(max_workers=CRAWL_WORKERS, thread_name_prefix="crawl")
+
+
+def _domain(url):
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _page_priority(url, label=""):
+    """Returns the rank of the first high-value keyword in the URL or link text, or None."""
+    haystack = f"{urlparse(url).path} {label}".lower()
+    for rank, keyword in enumerate(HIGH_VALUE_KEYWORDS):
+        if keyword in haystack:
+            return rank
+    return None
+
+
+def _candidate_links(base_url, soup):
+    for a in soup.find_all("a", href=True):
+        url = urldefrag(urljoin(base_url, a["href"]))[0]
+        yield url, a.get_text(strip=True)
+
+
+def _sitemap_links(sitemap_xml):
+    return [(url.strip(), "") for url in re.findall(r"<loc>(.*?)</loc>", sitemap_xml, re.S)]
+
+
+def rank_pages(start_url, links, limit):
+    """Keeps in-site, high-value links, deduplicated and ordered by keyword rank."""
+    domain = _domain(start_url)
+    seen = {urldefrag(start_url)[0].rstrip("/")}
+    ranked = []
+    for url, label in links:
+        key = url.rstrip("/")
+        if key in seen or _domain(url) != domain or not url.startswith("http"):
+            continue
+        if urlparse(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+            continue
+        rank = _page_priority(url, label)
+        if rank is None:
+            continue
+        seen.add(key)
+        ranked.append((rank, len(ranked), url))
+    return [url for _, _, url in sorted(ranked)[:limit]]
+
+
+def _revalidate(url, max_bytes):
+    # A page fetched before is only downloaded again if it changed (conditional GET)
+    return http_client.fetch_page(url, max_bytes=max_bytes, revalidate=True)
+
+
+class _Budget:
+    """Pages and bytes a crawl may still fetch.
+
+    Every fetch reserves its byte cap before it starts and gives back what it
+    did not read, so concurrent fetches can never overrun max_bytes together.
+    The cap is the same for every fetch until the budget runs low, since the
+    page store keeps one version of a page per cap.
+    """
+
+    def __init__(self, max_pages, max_bytes, page_cap):
+        self.pages_left = max_pages
+        self.bytes_left = max_bytes
+        self.page_cap = page_cap
+        self.reserved = 0
+        self._changed = asyncio.Condition()
+
+    async def reserve(self):
+        """Takes one page and returns the bytes reserved for it, or 0 once pages or bytes are spent."""
+        async with self._changed:
+            # Running fetches give back their unread bytes; wait for them rather than cut this page short
+            await self._changed.wait_for(lambda: self.bytes_left >= self.page_cap or not self.reserved)
+            if self.pages_left <= 0 or self.bytes_left <= 0:
+                return 0
+            size = min(self.page_cap, self.bytes_left)
+            self.pages_left -= 1
+            self.bytes_left -= size
+            self.reserved += size
+            return size
+
+    async def settle(self, reserved, spent):
+        async with self._changed:
+            self.reserved -= reserved
+            self.bytes_left += reserved - spent
+            self._changed.notify_all()
+
+
+async def crawl_site(start_url, max_pages=CRAWL_MAX_PAGES, max_bytes=CRAWL_MAX_BYTES, per_domain=CRAWL_PER_DOMAIN):
+    """Fetches the start page plus the most promising in-site pages concurrently.
+
+    Candidates come from the start page's links and /sitemap.xml. At most
+    per_domain fetches run against one domain at a time, and the crawl stops
+    scheduling pages once max_pages or max_bytes is spent. The sitemap's bytes
+    count against max_bytes too. Each fetch reads at most max_bytes / per_domain
+    (and FETCH_MAX_BYTES), so a full set of concurrent fetches always fits the
+    byte budget. Returns a dict with the fetched URLs, the merged page text
+    (start page first), every anchor text seen and how many pages came back
+    304 Not Modified.
+    """
+    loop = asyncio.get_running_loop()
+    # One extra page for the sitemap, which is not one of the max_pages
+    budget = _Budget(max_pages + 1, max_bytes, min(FETCH_MAX_BYTES, max(1, max_bytes // per_domain)))
+    semaphores = defaultdict(lambda: asyncio.Semaphore(per_domain))
+    not_modified = 0
+
+    async def fetch(url, report_errors=True):
+        nonlocal not_modified
+        async with semaphores[_domain(url)]:
+            reserved = await budget.reserve()
+            if not reserved:
+                return None
+            spent = 0
+            try:
+                page = await loop.run_in_executor(_executor, in_current_context(_revalidate, url, reserved))
+                spent = page["bytes"]
+            except Exception as e:
+                if report_errors:
+                    print(f"Crawl fetch failed for {url}: {e}")
+                return None
+            finally:
+                await budget.settle(reserved, spent)
+            not_modified += page.get("not_modified", False)
+            return page["text"] or None
+
+    origin = f"{urlparse(start_url).scheme}://{urlparse(start_url).netloc}"
+    home_html, sitemap_xml = await asyncio.gather(fetch(start_url), fetch(f"{origin}/sitemap.xml", report_errors=False))
+    result = {"pages": [], "text": "", "links": [], "not_modified": 0}
+    if home_html is None:
+        return result
+
+    home_soup = parse_html(home_html, label=start_url)
+    links = list(_candidate_links(start_url, home_soup))
+    if sitemap_xml and "<loc>" in sitemap_xml:
+        links += _sitemap_links(sitemap_xml)
+    targets = rank_pages(start_url, links, max_pages - 1)
+
+    pages = [(start_url, home_soup)]
+    for url, html in zip(targets, await asyncio.gather(*(fetch(url) for url in targets))):
+        if html:
+            pages.append((url, parse_html(html, label=url)))
+
+    result["pages"] = [url for url, _ in pages]
+    result["text"] = "\n".join(soup.get_text(separator=" ", strip=True) for _, soup in pages)
+    result["links"] = [a.get_text(strip=True) for _, soup in pages for a in soup.find_all("a")]
+    result["not_modified"] = not_modified
+    return result
@@ -0,0 +1,150 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from config import ALIAS_DB_PATH
+
+# Legal-form words dropped from the end of a name, so "Apple Inc." and "Apple" share one key.
+# Matched after punctuation is folded, so "S.A." is "sa" and "A/S" is "as".
+LEGAL_SUFFIXES = frozenset({
+    "ab", "ag", "as", "asa", "bhd", "bv", "co", "company", "corp", "corporation", "gmbh", "inc",
+    "incorporated", "kg", "kk", "lda", "limited", "llc", "llp", "lp", "ltd", "nv", "oy", "oyj",
+    "plc", "pte", "pty", "pvt", "sa", "sarl", "sas", "sdn", "se", "spa", "srl", "ulc",
+})
+
+# Dropped without a space ("McDonald's", "A.P.", "A/S"); every other non-word character is a space
+_JOINERS = re.compile(r"['’`./]")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_company_name(company_name):
+    """Folds case, accents, punctuation and legal suffixes: "Nestlé S.A." and "nestle" share one key.
+
+    A name that is nothing but legal words ("Limited") keeps the last one.
+    """
+    text = unicodedata.normalize("NFKD", company_name)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = _JOINERS.sub("", text.replace("&", " and "))
+    words = _SEPARATORS.sub(" ", text).split()
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    stripped = False
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+        stripped = True
+    # "Goldman Sachs & Co. LLC" leaves a dangling "and"
+    if stripped and len(words) > 1 and words[-1] == "and":
+        words.pop()
+    return " ".join(words)
+
+
+def site_key(website):
+    """Host (without www.) and path of a website URL; two names with the same site key are one company."""
+    parsed = urlparse(website if "//" in website else f"//{website}")
+    host = (parsed.netloc or "").lower().removeprefix("www.")
+    return f"{host}{parsed.path.rstrip('/')}" if host else ""
+
+# -------------------------
+# Alias Index
+
+class AliasIndex:
+    """Persistent map from spelling variants of company names to one canonical entity.
+
+    Every normalized variant (alias) points at an entity, which has a key,
+    the name it was first researched under and its official website. Two
+    names whose official site turns out to be the same are merged into one
+    entity, so "IBM" and "International Business Machines" share a report.
+    The whole table is held in dicts, so lookups never touch the database.
+    """
+
+    def __init__(self, path=ALIAS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entities (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    website TEXT NOT NULL DEFAULT '',
+                    site TEXT NOT NULL DEFAULT '',
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, entity_key TEXT NOT NULL)")
+            entities = conn.execute("SELECT key, name, website, site FROM entities").fetchall()
+            aliases = conn.execute("SELECT alias, entity_key FROM aliases").fetchall()
+        self._entities = {key: {"key": key, "name": name, "website": website, "site": site}
+                          for key, name, website, site in entities}
+        self._sites = {entity["site"]: key for key, entity in self._entities.items() if entity["site"]}
+        self._aliases = dict(aliases)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def key(self, company_name):
+        """The canonical key for company_name: its entity's key, or its normalized name if unknown."""
+        alias = normalize_company_name(company_name)
+        return self._aliases.get(alias, alias)
+
+    def entity(self, company_name):
+        """The entity as a dict (key, name, website, site), or None while the name is unknown."""
+        return self._entities.get(self.key(company_name))
+
+    def learn(self, company_name, website=""):
+        """Records company_name as an alias, of the entity that owns website if one does, and returns its key."""
+        alias = normalize_company_name(company_name)
+        site = site_key(website) if website else ""
+        with self._lock:
+            key = self._aliases.get(alias) or self._sites.get(site) or alias
+            entity = self._entities.get(key)
+            if entity is None:
+                entity = self._entities[key] = {"key": key, "name": company_name.strip(), "website": "", "site": ""}
+            if site and not entity["site"]:
+                entity.update(website=website, site=site)
+                self._sites.setdefault(site, key)
+            elif self._aliases.get(alias) == key:
+                return key
+            self._aliases[alias] = key
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entities (key, name, website, site, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, entity["name"], entity["website"], entity["site"], time.time()),
+                )
+                conn.execute("INSERT OR REPLACE INTO aliases (alias, entity_key) VALUES (?, ?)", (alias, key))
+        return key
+
+    def stats(self):
+        with self._lock:
+            return {"entities": len(self._entities), "aliases": len(self._aliases), "sites": len(self._sites)}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def alias_index():
+    """The process-wide alias index, loaded from ALIAS_DB_PATH on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AliasIndex()
+    return _index
+
+
+def company_key(company_name):
+    """The key every cache uses for company_name, the same for all of its known spellings."""
+    return alias_index().key(company_name)
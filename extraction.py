@@ -0,0 +1,138 @@
+import re
+from bisect import bisect_left
+from itertools import accumulate
+
+# -------------------------
+# Field Specs
+#
+# Every field the scraper fills is declared here once and compiled at import.
+# Pattern fields take the first regex match. "requires" lists lowercase
+# literals of which at least one must occur for the pattern to match, so the
+# regex only runs on pages that can contain it; "lowered" patterns only
+# capture case-free text and run against the lowercased page without re.I.
+# Keyword fields collect the distinct sentences (text split on '.') containing
+# any of their keywords.
+
+PATTERN_FIELDS = {
+    "phone_number": {
+        "pattern": re.compile(r'(\+?\d{1,3}[-.\s]?\(?\d{1,4}\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9})'),
+        "format": lambda m: m.group(0),
+    },
+    "address": {
+        "pattern": re.compile(r'\d{1,5}\s[\w\s.,-]+,\s\w+,\s[A-Z]{2}\s\d{5}(-\d{4})?'),
+        "format": lambda m: m.group(0),
+    },
+    "employee_count": {
+        "pattern": re.compile(r'([0-9,]+)\s+(employees|staff|workers|team)'),
+        "format": lambda m: m.group(1).replace(',', ''),
+        "requires": ['employees', 'staff', 'workers', 'team'],
+        "lowered": True,
+    },
+    "annual_revenue": {
+        "pattern": re.compile(r'(revenue|annual revenue|sales|turnover)[\s\w]{0,20}?\$?([\d,.]+)\s?(million|billion)?', re.I),
+        "format": lambda m: f"${m.group(2).replace(',', '')} {m.group(3) or ''}".strip(),
+        "requires": ['revenue', 'sales', 'turnover'],
+    },
+    "recent_funding": {
+        "pattern": re.compile(r'\$?([\d,.]+)\s?(million|billion)?\s+(funding|investment|raised|round)', re.I),
+        "format": lambda m: f"${m.group(1).replace(',', '')} {m.group(2) or ''}".strip(),
+        "requires": ['funding', 'investment', 'raised', 'round'],
+    },
+    "sic_codes": {
+        "pattern": re.compile(r'sic code[:\s]*([\d]{4})'),
+        "format": lambda m: m.group(1),
+        "requires": ['sic code'],
+        "lowered": True,
+    },
+}
+
+KEYWORD_FIELDS = {
+    "leadership_changes": {"keywords": ['ceo', 'appointed', 'named', 'joined', 'leadership'], "limit": 3, "default": ""},
+    "recent_news": {"keywords": ['news', 'announcement', 'press release', 'update'], "limit": 3, "default": ""},
+    "strengths": {"keywords": ['strength'], "limit": None, "default": "Not Available"},
+    "weaknesses": {"keywords": ['weakness'], "limit": None, "default": "Not Available"},
+    "opportunities": {"keywords": ['opportunit'], "limit": None, "default": "Not Available"},
+    "threats": {"keywords": ['threat'], "limit": None, "default": "Not Available"},
+}
+
+# Listed in priority order: the first vendor in this list mentioned anywhere wins
+ERP_KEYWORDS = ['SAP', 'Oracle ERP', 'Microsoft Dynamics', 'NetSuite', 'Infor']
+ERP_INDEX = [(erp.lower(), erp) for erp in ERP_KEYWORDS]
+
+JOB_POSTING_PATTERN = re.compile(r'sap|erp')
+NO_JOB_POSTINGS = "No SAP job postings found."
+
+# -------------------------
+# Extraction
+
+def _sentence_hits(lowered, keyword, sentences, sentence_ends, limit):
+    """Indexes of the distinct sentences containing keyword, found with C-level substring search.
+
+    After each hit the scan jumps to the next sentence. A sentence repeating
+    an earlier hit (footers, banners) is skipped, so it never uses up the
+    limit, and the scan stops early once limit distinct sentences are found.
+    """
+    hits = []
+    seen = set()
+    pos = lowered.find(keyword)
+    while pos != -1:
+        index = bisect_left(sentence_ends, pos + 1)
+        sentence = sentences[index].strip()
+        if sentence not in seen:
+            seen.add(sentence)
+            hits.append(index)
+            if limit and len(hits) >= limit:
+                break
+        pos = lowered.find(keyword, sentence_ends[index])
+    return hits
+
+
+def extract_company_info(company_info, text, link_texts=None):
+    """Fills company_info in place from page text (and anchor texts, when given).
+
+    The text is lowercased and segmented into sentences once, and every
+    field is filled from that single pass instead of re-splitting per field.
+    """
+    lowered = text.lower()
+
+    for field, spec in PATTERN_FIELDS.items():
+        if "requires" in spec and not any(literal in lowered for literal in spec["requires"]):
+            continue
+        match = spec["pattern"].search(lowered if spec.get("lowered") else text)
+        if match:
+            company_info[field] = spec["format"](match)
+
+    sentences = text.split('.')
+    # lower() never creates or removes '.', so both splits line up sentence by sentence
+    sentence_ends = list(accumulate(len(part) + 1 for part in lowered.split('.')))
+
+    for field, spec in KEYWORD_FIELDS.items():
+        # The first `limit` distinct matching sentences are always among each keyword's first `limit` hits
+        hits = set()
+        for keyword in spec["keywords"]:
+            hits.update(_sentence_hits(lowered, keyword, sentences, sentence_ends, spec["limit"]))
+        # Different keywords can hit copies of the same sentence
+        snippets = list(dict.fromkeys(sentences[i].strip() for i in sorted(hits)))[:spec["limit"]]
+        company_info[field] = ' '.join(snippets) or spec["default"]
+
+    for erp_lower, erp in ERP_INDEX:
+        if erp_lower in lowered:
+            company_info["current_erp"] = erp
+            break
+
+    if link_texts is not None:
+        job_postings = [link for link in dict.fromkeys(link_texts) if JOB_POSTING_PATTERN.search(link.lower())]
+        company_info["recent_sap_job_postings"] = ', '.join(job_postings) if job_postings else NO_JOB_POSTINGS
+
+    return company_info
+
+
+def erp_mentions(text, limit=5):
+    """The distinct sentences naming any ERP vendor, in text order."""
+    lowered = text.lower()
+    sentences = text.split('.')
+    sentence_ends = list(accumulate(len(part) + 1 for part in lowered.split('.')))
+    hits = set()
+    for erp_lower, _ in ERP_INDEX:
+        hits.update(_sentence_hits(lowered, erp_lower, sentences, sentence_ends, limit))
+    return list(dict.fromkeys(sentences[i].strip() for i in sorted(hits)))[:limit]
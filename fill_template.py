@@ -1,21 +1,104 @@
+import copy
+import hashlib
 import os
-from docx import Document
+import threading
+import zipfile
+from collections import OrderedDict
 from io import BytesIO
 
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from docx.text.paragraph import Paragraph
+
+from config import DOCX_CACHE_ENTRIES
+from tracing import span
+
+TEMPLATE_PATH = "ModelTemplate.docx"
+PLACEHOLDER = "{{generatedContent}}"
+DOCUMENT_PART = "word/document.xml"
+
+_lock = threading.Lock()
+_templates = {}
+_rendered = OrderedDict()
+
+
+class _PreparsedTemplate:
+    """A template unzipped and parsed once per process.
+
+    Only word/document.xml differs between reports, so every other part is
+    kept as an already-compressed zip and each render clones the parsed
+    document element, fills it in and appends the new document part.
+    """
+
+    def __init__(self, template_path):
+        self.document_element = Document(template_path).element
+        self.mtime = os.path.getmtime(template_path)
+
+        base = BytesIO()
+        with zipfile.ZipFile(template_path) as source, zipfile.ZipFile(base, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename != DOCUMENT_PART:
+                    target.writestr(info, source.read(info.filename))
+        self.base_zip = base.getvalue()
+
+    def render(self, model_output):
+        element = copy.deepcopy(self.document_element)
+        for p in element.body.p_lst:
+            para = Paragraph(p, None)
+            if PLACEHOLDER in para.text:
+                para.text = para.text.replace(PLACEHOLDER, model_output)
+
+        output_stream = BytesIO(self.base_zip)
+        with zipfile.ZipFile(output_stream, "a", zipfile.ZIP_DEFLATED) as target:
+            target.writestr(DOCUMENT_PART, serialize_part_xml(element))
+        return output_stream.getvalue()
+
+
+def _template(template_path):
+    with _lock:
+        template = _templates.get(template_path)
+    # Reload if the template file was replaced on disk
+    if template is None or template.mtime != os.path.getmtime(template_path):
+        template = _PreparsedTemplate(template_path)
+        with _lock:
+            _templates[template_path] = template
+    return template
+
+
+def preload_template(template_path=TEMPLATE_PATH):
+    """Unzips and parses the template ahead of the first export."""
+    _template(template_path)
+
+
+def _render_key(template_path, model_output):
+    return hashlib.sha256(f"{template_path}\x00{model_output}".encode("utf-8")).hexdigest()
+
+
+def cached_report_docx(model_output, template_path=TEMPLATE_PATH):
+    """Returns the already rendered .docx bytes for this report, or None if it was never rendered."""
+    key = _render_key(template_path, model_output)
+    with _lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+    return None
+
+
+def render_report_docx(model_output, template_path=TEMPLATE_PATH):
+    """Renders the report into the template, reusing the bytes of an earlier render of the same report."""
+    with span("docx_render") as render_span:
+        data = cached_report_docx(model_output, template_path)
+        render_span["cached"] = data is not None
+        if data is None:
+            data = _template(template_path).render(model_output)
+            with _lock:
+                _rendered[_render_key(template_path, model_output)] = data
+                while len(_rendered) > DOCX_CACHE_ENTRIES:
+                    _rendered.popitem(last=False)
+        render_span["bytes"] = len(data)
+    return data
+
+
 def fill_word_template(template_path, model_output):
     """Replaces {{generatedContent}} with the AI-generated company report."""
-    
-    # Load the template document
-    doc = Document("ModelTemplate.docx")
-
-    # Replace placeholder {{generatedContent}}
-    for para in doc.paragraphs:
-        if "{{generatedContent}}" in para.text:
-            para.text = para.text.replace("{{generatedContent}}", model_output)
-
-    # Save to a BytesIO object for Streamlit download
-    output_stream = BytesIO()
-    doc.save(output_stream)
-    output_stream.seek(0)
-    
-    return output_stream
+    return BytesIO(render_report_docx(model_output, template_path))
@@ -0,0 +1,205 @@
+import codecs
+import hashlib
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+from config import (
+    FETCH_MAX_BYTES,
+    HTTP_BACKOFF,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+    SHARED_PAGE_TTL_SECONDS,
+)
+from page_store import page_store
+from shared_cache import get_json, set_json
+from singleflight import flight
+from tracing import span
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+# gzip and deflate always; br and zstd whenever their decoders are installed
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    **make_headers(accept_encoding=True),
+}
+
+# Anything else (PDFs, images, video, archives) is skipped before the body is read
+ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "text/xml", "application/xml")
+
+CHUNK_SIZE = 16 * 1024
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+XML_ENCODING = re.compile(rb'<\?xml[^>]+encoding=["\']([\w-]+)', re.I)
+
+
+class CappedRetry(Retry):
+    """Retry that honours Retry-After only up to HTTP_READ_TIMEOUT seconds.
+
+    A server asking for minutes would otherwise hold the fetch, and the
+    crawl or search waiting on it, for that long.
+    """
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), HTTP_READ_TIMEOUT)
+
+
+def build_session():
+    """Creates a keep-alive session with a bounded retry and backoff policy."""
+    retry = CappedRetry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = build_session()
+_stats_lock = threading.Lock()
+_requests_sent = 0
+_fetches = flight("fetch")
+
+
+def connection_stats():
+    """Reports how many requests went out and how many TCP/TLS connections the live pools needed."""
+    connections = 0
+    pool_requests = 0
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+    reused = max(pool_requests - connections, 0)
+    return {
+        "requests": _requests_sent,
+        "connections_opened": connections,
+        "connections_reused": reused,
+        "reuse_ratio": reused / pool_requests if pool_requests else 0.0,
+    }
+
+
+def _valid_charset(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def _charset(content_type, head):
+    """Picks the charset from the Content-Type header, then a <meta> or XML declaration, else UTF-8.
+
+    Only the first chunk is inspected, so no detection ever runs over the whole body.
+    """
+    match = re.search(r'charset=["\']?([\w-]+)', content_type, re.I)
+    if match and _valid_charset(match.group(1)):
+        return _valid_charset(match.group(1))
+    for pattern in (META_CHARSET, XML_ENCODING):
+        match = pattern.search(head)
+        if match and _valid_charset(match.group(1).decode("ascii", "ignore")):
+            return _valid_charset(match.group(1).decode("ascii", "ignore"))
+    return "utf-8"
+
+
+def fetch_page(url, max_bytes=FETCH_MAX_BYTES, allowed_types=ALLOWED_CONTENT_TYPES, raise_for_status=True,
+               revalidate=False, **kwargs):
+    """Streams a page in chunks and stops reading once max_bytes of decoded body is in.
+
+    Responses whose Content-Type is not in allowed_types are closed without
+    reading the body. Returns a dict with the final url, status, headers,
+    decoded text, byte count and whether the body was truncated or skipped.
+    Concurrent fetches of the same URL with the same options share one request,
+    and successful pages are shared with other instances for SHARED_PAGE_TTL_SECONDS.
+    With revalidate the page is fetched conditionally against its last stored
+    version (page_store.py); "not_modified" and "changed" then say how it compares.
+    """
+    key = (url, max_bytes, allowed_types, raise_for_status, revalidate, repr(sorted(kwargs.items())))
+    return dict(_fetches.do(key, _shared_fetch, key, url, max_bytes, allowed_types, raise_for_status, revalidate, **kwargs))
+
+
+def _shared_fetch(key, url, max_bytes, allowed_types, raise_for_status, revalidate, **kwargs):
+    shared_key = "page:" + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+    page = get_json(shared_key)
+    if page is not None:
+        return page
+    if revalidate:
+        page = _revalidated_fetch(url, max_bytes, allowed_types, raise_for_status, **kwargs)
+    else:
+        page = _traced_fetch(url, max_bytes, allowed_types, raise_for_status, **kwargs)
+    if page["status"] == 200 and not page["skipped"]:
+        set_json(shared_key, page, SHARED_PAGE_TTL_SECONDS)
+    return page
+
+
+def _revalidated_fetch(url, max_bytes, allowed_types, raise_for_status, **kwargs):
+    store = page_store()
+    entry = store.get(url, max_bytes)
+    headers = {**(kwargs.pop("headers", None) or {}), **store.conditional_headers(entry)}
+    page = _traced_fetch(url, max_bytes, allowed_types, raise_for_status, headers=headers, **kwargs)
+    return store.record(url, max_bytes, page, entry)
+
+
+def _traced_fetch(url, max_bytes, allowed_types, raise_for_status, **kwargs):
+    with span("fetch", url=url) as fetch_span:
+        try:
+            page = _fetch_page(url, max_bytes, allowed_types, raise_for_status, **kwargs)
+        except requests.HTTPError as e:
+            fetch_span["status"] = e.response.status_code if e.response is not None else None
+            raise
+        fetch_span.update(status=page["status"], bytes=page["bytes"], truncated=page["truncated"], skipped=page["skipped"])
+    return page
+
+
+def _fetch_page(url, max_bytes, allowed_types, raise_for_status, **kwargs):
+    global _requests_sent
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    with _stats_lock:
+        _requests_sent += 1
+
+    with _session.get(url, stream=True, **kwargs) as response:
+        if raise_for_status:
+            response.raise_for_status()
+        page = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "text": "",
+            "bytes": 0,
+            "truncated": False,
+            "skipped": False,
+        }
+        if response.status_code == 304:
+            # Not modified since the stored version; the caller has the body
+            return page
+        content_type = response.headers.get("Content-Type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type and media_type not in allowed_types:
+            page["skipped"] = True
+            return page
+
+        chunks = []
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            chunks.append(chunk)
+            page["bytes"] += len(chunk)
+            if page["bytes"] > max_bytes:
+                page["truncated"] = True
+                break
+
+    body = b"".join(chunks)[:max_bytes]
+    page["bytes"] = len(body)
+    page["text"] = body.decode(_charset(content_type, body[:CHUNK_SIZE]), errors="replace")
+    return page
@@ -0,0 +1,298 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from config import JOB_DB_PATH, JOB_RETENTION_HOURS, JOB_WORKERS, LOCK_POLL_SECONDS, LOCK_WAIT_SECONDS
+from entities import alias_index, company_key
+from scraper import google_search, scrape_company_website
+from shared_cache import Lease
+from singleflight import flight
+from summary import SUMMARY_FAILED, SummaryStream
+from tracing import event, trace_request
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# -------------------------
+# Job Queue
+
+class JobQueue:
+    """Runs research requests on background worker threads and tracks them in a job table.
+
+    submit() returns a job ID at once; the UI polls get() for the state
+    (queued, running, done, failed), the current stage and the report text
+    generated so far. Finished reports are saved to the report store. Queued
+    jobs are started round robin per owner (browser session), so one user
+    submitting many companies does not hold up everyone else. Jobs for the
+    same company that run at the same time share one research run, and a
+    lease lock in the shared backend keeps other instances from researching
+    the company as well: they wait for the report instead.
+    """
+
+    def __init__(self, report_store, path=JOB_DB_PATH, workers=JOB_WORKERS, retention_hours=JOB_RETENTION_HOURS):
+        self.report_store = report_store
+        self.path = path
+        self.retention_seconds = retention_hours * 3600
+        self._cond = threading.Condition()
+        # owner -> its queued jobs; the first owner in line is served next
+        self._ready = OrderedDict()
+        # research key -> report chunks so far, and the running jobs attached to each key
+        self._partial = {}
+        self._attached = {}
+        self._research = flight("company")
+        self._closed = False
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    company_name TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL DEFAULT '',
+                    error TEXT NOT NULL DEFAULT '',
+                    trace_id TEXT NOT NULL DEFAULT '',
+                    pid INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, created_at)")
+        self._recover()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _stage(self, key, stage):
+        """Sets the stage of every job attached to a research run."""
+        with self._cond:
+            job_ids = list(self._attached.get(key, ()))
+        for job_id in job_ids:
+            self._update(job_id, stage=stage)
+
+    def _recover(self):
+        """Fails the unfinished jobs of processes that are gone and prunes old finished jobs."""
+        with self._connect() as conn:
+            stale = conn.execute(
+                "SELECT id, pid FROM jobs WHERE status IN (?, ?)", ACTIVE_STATES
+            ).fetchall()
+            for row in stale:
+                if row["pid"] != os.getpid() and not _process_alive(row["pid"]):
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Interrupted by a server restart", time.time(), row["id"]),
+                    )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - self.retention_seconds),
+            )
+
+    def submit(self, company_name, owner, template=None):
+        """Queues research for company_name and returns the job ID."""
+        if self._closed:
+            raise RuntimeError("Job queue is closed")
+        job_id = uuid.uuid4().hex[:16]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, company_name, owner, status, stage, pid, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, company_name, owner, QUEUED, "Waiting for a worker", os.getpid(), time.time()),
+            )
+        with self._cond:
+            self._ready.setdefault(owner, deque()).append((job_id, company_name, template))
+            self._cond.notify()
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict, with "partial" holding the report text generated so far; None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        with self._cond:
+            key = next((key for key, job_ids in self._attached.items() if job_id in job_ids), None)
+            job["partial"] = "".join(self._partial.get(key, ()))
+        return job
+
+    def jobs(self, owner, limit=20):
+        """The owner's most recent jobs, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?", (owner, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        with self._cond:
+            queued_here = sum(len(queue) for queue in self._ready.values())
+        return {
+            **{state: counts.get(state, 0) for state in (QUEUED, RUNNING, DONE, FAILED)},
+            "queue_depth": queued_here,
+            "workers": sum(worker.is_alive() for worker in self._workers),
+        }
+
+    def healthy(self):
+        return not self._closed and all(worker.is_alive() for worker in self._workers)
+
+    def close(self):
+        """Stops the workers once their current job is finished and fails the jobs still waiting for one.
+
+        Waiting jobs only live in this queue's memory, and their rows carry a
+        live pid, so _recover() in a replacement queue would never fail them.
+        """
+        with self._cond:
+            self._closed = True
+            waiting = [job_id for queue in self._ready.values() for job_id, _, _ in queue]
+            self._ready.clear()
+            self._cond.notify_all()
+        for job_id in waiting:
+            self._update(job_id, status=FAILED, stage="Failed", finished_at=time.time(),
+                         error="The job queue was restarted before the job started; please submit it again")
+
+    # -------------------------
+    # Workers
+
+    def _next(self):
+        with self._cond:
+            while not self._ready and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            owner, queue = next(iter(self._ready.items()))
+            job = queue.popleft()
+            # Served owners go to the back of the line, so owners take turns
+            self._ready.move_to_end(owner)
+            if not queue:
+                del self._ready[owner]
+            return job
+
+    def _work(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            self._run(*job)
+
+    @staticmethod
+    def _key(company_name, template):
+        return company_key(company_name), template.template if template else None
+
+    def _run(self, job_id, company_name, template):
+        key = self._key(company_name, template)
+        with self._cond:
+            self._attached.setdefault(key, set()).add(job_id)
+        self._update(job_id, status=RUNNING, stage="Checking saved reports", started_at=time.time())
+        with trace_request("research", company=company_name, source="job", job_id=job_id) as trace:
+            try:
+                self._update(job_id, trace_id=trace.id)
+                # A job for the same company already in flight is joined instead of repeated
+                self._research.do(key, self._research_company, key, company_name, template)
+                self._update(job_id, status=DONE, stage="Done", finished_at=time.time())
+            except Exception as e:
+                trace.error = f"{type(e).__name__}: {e}"
+                print(f"Job {job_id} for {company_name} failed: {e}")
+                self._update(job_id, status=FAILED, stage="Failed", error=str(e), finished_at=time.time())
+            finally:
+                with self._cond:
+                    self._attached[key].discard(job_id)
+                    if not self._attached[key]:
+                        del self._attached[key]
+
+    def _research_company(self, key, company_name, template):
+        """Researches one company and saves the report; runs once per key however many jobs wait on it.
+
+        Its report store lookups are not counted as hits or misses: whoever
+        submitted the job has already counted its own lookup.
+        """
+        if self.report_store.get(company_name, count=False) is not None:
+            return
+        if alias_index().entity(company_name) is None:
+            # A new spelling may name a company already researched under another one; its
+            # official site tells (the lookup is cached, so the scrape below reuses it)
+            self._stage(key, "Searching")
+            website = google_search(f"{company_name} official site")
+            if website and alias_index().learn(company_name, website) != key[0]:
+                if self.report_store.get(company_name, count=False) is not None:
+                    return
+        lease = Lease(f"research:{company_key(company_name)}")
+        waiting_since = time.monotonic()
+        waited = False
+        while not lease.acquire():
+            waited = True
+            # Another instance is researching this company; its report lands in the shared cache
+            if time.monotonic() - waiting_since > LOCK_WAIT_SECONDS:
+                raise RuntimeError(f"Another server has been researching {company_name} for too long")
+            self._stage(key, "Waiting for another server")
+            time.sleep(LOCK_POLL_SECONDS)
+            if self.report_store.get(company_name, count=False) is not None:
+                return
+        try:
+            # The previous holder may have saved the report just before releasing the lease
+            if waited and self.report_store.get(company_name, count=False) is not None:
+                return
+            self._write_report(key, company_name, template)
+        finally:
+            if lease.lost:
+                print(f"Lease on {company_name} was lost during research; another server may have repeated it")
+            lease.release()
+
+    def _write_report(self, key, company_name, template):
+        self._stage(key, "Searching")
+        company_info = scrape_company_website(company_name)
+        alias_index().learn(company_name, company_info["company_official_website"])
+
+        # A stale report is refreshed: only the sections whose fields changed are rewritten
+        previous = self.report_store.latest(company_name)
+        self._stage(key, "Updating report" if previous else "Writing report")
+        summary_stream = SummaryStream(company_name, company_info, template=template, previous=previous)
+        with self._cond:
+            self._partial[key] = []
+        try:
+            for chunk in summary_stream:
+                with self._cond:
+                    self._partial[key].append(chunk)
+        finally:
+            with self._cond:
+                self._partial.pop(key, None)
+        if summary_stream.failed:
+            raise RuntimeError(SUMMARY_FAILED)
+        if previous:
+            event("report_refresh", reused=len(summary_stream.reused),
+                  sections=len(summary_stream.sections) if summary_stream.sectioned else 1)
+        self.report_store.put(company_name, summary_stream.text, summary_stream.fingerprints)
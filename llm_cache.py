@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from config import LLM_CACHE_DIR, LLM_CACHE_DISK_MB, LLM_CACHE_MEMORY_MB
+
+
+def cache_key(model, temperature, prompt):
+    """Content address of one completion: the same model, temperature and prompt give the same key."""
+    return hashlib.sha256(f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier cache of LLM completions keyed by cache_key().
+
+    The memory tier is an LRU bounded by total text size. The disk tier keeps
+    zlib-compressed files shared by every process on the instance and evicts
+    the least recently used files once it grows past its byte limit.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, memory_mb=LLM_CACHE_MEMORY_MB, disk_mb=LLM_CACHE_DISK_MB):
+        self.directory = directory
+        self.memory_limit = int(memory_mb * 1024 * 1024)
+        self.disk_limit = int(disk_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bytes_saved": 0}
+        os.makedirs(directory, exist_ok=True)
+        # Running total so a put only rescans the directory when it may be over the limit
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.z")
+
+    def _remember(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        self._memory[key] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+
+    def get(self, key, prompt_bytes=0):
+        """Returns the cached completion or None. prompt_bytes counts toward bytes_saved on a hit."""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._stats["bytes_saved"] += prompt_bytes + len(text.encode("utf-8"))
+                return text
+
+        try:
+            with open(self._path(key), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+            os.utime(self._path(key))  # mark as recently used for disk eviction
+        except (OSError, zlib.error):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._remember(key, text)
+            self._stats["disk_hits"] += 1
+            self._stats["bytes_saved"] += prompt_bytes + len(text.encode("utf-8"))
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._remember(key, text)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = zlib.compress(text.encode("utf-8"), 6)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        # An overwritten entry's old file no longer counts toward the disk tier
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_bytes += len(data) - replaced
+            over_limit = self._disk_bytes > self.disk_limit
+        if over_limit:
+            self._evict_disk()
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".z"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def invalidate(self, key=None):
+        """Drops one entry, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+                self._memory_bytes = 0
+            elif key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        paths = [path for _, _, path in self._disk_entries()] if key is None else [self._path(key)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_bytes"] = self._disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,9 @@
+# -------------------------
+# Metrics
+#
+# Helpers for the latency and wait statistics the modules keep in memory.
+
+def percentile(samples, pct):
+    """The nearest-rank pct percentile of samples, or 0.0 when there are none."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
@@ -0,0 +1,288 @@
+import importlib
+import threading
+import time
+from collections import deque
+
+import httpx
+import openai
+from langchain_openai import AzureChatOpenAI
+
+from config import (
+    AZURE_DEPLOYMENT,
+    AZURE_MODEL,
+    AZURE_PRICE,
+    GROQ_MODEL,
+    GROQ_PRICE,
+    LLM_MAX_RETRIES,
+    RATE_LIMIT_OUTPUT_TOKENS,
+    ROUTE_PROVIDERS,
+    ROUTE_TIMEOUTS,
+)
+from prompt_budget import count_tokens
+from metrics import percentile
+from rate_limiter import RateLimitTimeout, acquire, settle
+from singleflight import flight
+from tracing import span
+
+# -------------------------
+# Providers
+#
+# Each route lists providers in order of preference (config.ROUTE_PROVIDERS).
+# A call goes to the first provider that can be built; when it times out,
+# cannot connect or is rate limited (by the provider, or by waiting too long in
+# rate_limiter.py's queue), the next one takes over. Any other error is raised,
+# since another model would most likely fail the same way.
+
+ROUTE_TEMPERATURES = {"extraction": 0.0, "synthesis": 0.7}
+
+
+def _azure(route):
+    return AzureChatOpenAI(
+        deployment_name=AZURE_DEPLOYMENT,
+        model_name=AZURE_MODEL,
+        temperature=ROUTE_TEMPERATURES[route],
+        timeout=ROUTE_TIMEOUTS[route],
+        max_retries=LLM_MAX_RETRIES,
+        stream_usage=True,
+    )
+
+
+def _groq(route):
+    # langchain_groq is only imported once a route actually needs it
+    ChatGroq = importlib.import_module("langchain_groq").ChatGroq
+    return ChatGroq(
+        model=GROQ_MODEL,
+        temperature=ROUTE_TEMPERATURES[route],
+        timeout=ROUTE_TIMEOUTS[route],
+        max_retries=LLM_MAX_RETRIES,
+    )
+
+
+# name: (builder, cache model id, USD per million input and output tokens)
+PROVIDERS = {
+    "azure": (_azure, f"{AZURE_DEPLOYMENT}/{AZURE_MODEL}", AZURE_PRICE),
+    "groq": (_groq, f"groq/{GROQ_MODEL}", GROQ_PRICE),
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def chat_model(provider, route):
+    """The provider's chat model for a route, built once per process; None when it cannot be built (e.g. no API key)."""
+    key = (provider, route)
+    with _models_lock:
+        if key not in _models:
+            try:
+                _models[key] = PROVIDERS[provider][0](route)
+            except Exception as e:
+                print(f"Model provider {provider} unavailable for {route}: {e}")
+                _models[key] = None
+    return _models[key]
+
+
+def build_models():
+    """Builds every configured route's models up front, e.g. during warm-up."""
+    for route, providers in ROUTE_PROVIDERS.items():
+        for provider in providers:
+            chat_model(provider, route)
+
+
+def cache_model(route, provider=None):
+    """Identifies a provider's model (the route's preferred one by default) in response cache keys.
+
+    Lookups use the preferred model: the first provider of the route that can
+    be built, which is the one a call would go to. A completion is stored
+    under the model that actually answered it, so a failover answer is never
+    served as the preferred model's.
+    """
+    if provider is None:
+        available = [name for name in ROUTE_PROVIDERS[route] if chat_model(name, route) is not None]
+        provider = available[0] if available else ROUTE_PROVIDERS[route][0]
+    return PROVIDERS[provider][1]
+
+
+def _failover_errors():
+    errors = [RateLimitTimeout, httpx.TimeoutException, openai.APIConnectionError, openai.RateLimitError]
+    try:
+        groq = importlib.import_module("groq")
+        errors += [groq.APIConnectionError, groq.RateLimitError]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+FAILOVER_ERRORS = _failover_errors()
+
+# -------------------------
+# Route Metrics
+
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+
+def _route_metrics(route, provider):
+    return _metrics.setdefault((route, provider), {
+        "calls": 0, "errors": 0, "failovers": 0,
+        "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        "latency": deque(maxlen=500),
+    })
+
+
+def _usage(message, prompt, text):
+    """Token counts reported by the provider, estimated from the texts when it reports none."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens") or count_tokens(prompt), usage.get("output_tokens") or count_tokens(text)
+
+
+def _record(route, provider, elapsed, input_tokens, output_tokens):
+    input_price, output_price = PROVIDERS[provider][2]
+    cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    with _metrics_lock:
+        metrics = _route_metrics(route, provider)
+        metrics["calls"] += 1
+        metrics["input_tokens"] += input_tokens
+        metrics["output_tokens"] += output_tokens
+        metrics["cost_usd"] += cost
+        metrics["latency"].append(elapsed)
+    return cost
+
+
+def _record_error(route, provider, failover):
+    with _metrics_lock:
+        metrics = _route_metrics(route, provider)
+        metrics["errors"] += 1
+        metrics["failovers"] += failover
+
+
+def route_stats():
+    """Calls, errors, failovers away from the provider, latency (seconds), tokens and cost per (route, provider)."""
+    with _metrics_lock:
+        snapshot = {key: dict(metrics, latency=list(metrics["latency"])) for key, metrics in _metrics.items()}
+    return {
+        f"{route}/{provider}": {
+            **{name: value for name, value in metrics.items() if name != "latency"},
+            "latency_p50": percentile(metrics["latency"], 50),
+            "latency_p95": percentile(metrics["latency"], 95),
+        }
+        for (route, provider), metrics in snapshot.items()
+    }
+
+# -------------------------
+# Routed Calls
+
+def _providers(route):
+    available = [(name, chat_model(name, route)) for name in ROUTE_PROVIDERS[route]]
+    available = [(name, model) for name, model in available if model is not None]
+    if not available:
+        raise RuntimeError(f"No model provider available for route {route}")
+    return available
+
+
+_prompts = flight("llm")
+
+
+def invoke(route, prompt, **attrs):
+    """Returns the completion text for prompt from the first provider of the route that answers.
+
+    attrs are added to each attempt's llm span. Concurrent calls with the
+    same route and prompt share one completion.
+    """
+    return complete(route, prompt, **attrs)[0]
+
+
+def complete(route, prompt, **attrs):
+    """Like invoke, but returns (text, provider), provider being the one that answered."""
+    return _prompts.do((route, prompt), _invoke, route, prompt, **attrs)
+
+
+def _invoke(route, prompt, **attrs):
+    providers = _providers(route)
+    # What the call counts against the provider's tokens-per-minute limit until its real usage is known
+    reserved = count_tokens(prompt) + RATE_LIMIT_OUTPUT_TOKENS
+    for i, (provider, model) in enumerate(providers):
+        with span("llm", route=route, provider=provider, model=model.model_name,
+                  prompt_bytes=len(prompt.encode("utf-8")), **attrs) as llm_span:
+            granted = False
+            try:
+                llm_span["queue_ms"] = round(acquire(provider, reserved) * 1000, 2)
+                granted = True
+                started = time.perf_counter()
+                message = model.invoke(prompt)
+            except FAILOVER_ERRORS as e:
+                # A failed attempt gives its token reservation back, so failovers do not drain the bucket
+                if granted:
+                    settle(provider, reserved, 0)
+                last = i == len(providers) - 1
+                _record_error(route, provider, failover=not last)
+                if last:
+                    raise
+                print(f"{provider} failed on route {route}, failing over to {providers[i + 1][0]}: {e}")
+                llm_span["failover"] = f"{type(e).__name__}: {e}"
+                continue
+            except Exception:
+                if granted:
+                    settle(provider, reserved, 0)
+                _record_error(route, provider, failover=False)
+                raise
+            text = message.content.strip()
+            input_tokens, output_tokens = _usage(message, prompt, text)
+            settle(provider, reserved, input_tokens + output_tokens)
+            llm_span["output_bytes"] = len(text.encode("utf-8"))
+            llm_span["cost_usd"] = _record(route, provider, time.perf_counter() - started, input_tokens, output_tokens)
+            return text, provider
+
+
+def stream(route, prompt, answered=None, **attrs):
+    """Yields the completion for prompt chunk by chunk from the first provider of the route that answers.
+
+    A provider may only be replaced before its first chunk; an error after
+    that is raised, since the caller has already shown part of the answer.
+    Once the stream is done, answered (a dict, if given) holds the
+    "provider" that produced it.
+    """
+    providers = _providers(route)
+    # What the call counts against the provider's tokens-per-minute limit until its real usage is known
+    reserved = count_tokens(prompt) + RATE_LIMIT_OUTPUT_TOKENS
+    for i, (provider, model) in enumerate(providers):
+        with span("llm", route=route, provider=provider, model=model.model_name,
+                  prompt_bytes=len(prompt.encode("utf-8")), stream=True, **attrs) as llm_span:
+            chunks, usage_message = [], None
+            granted = False
+            try:
+                llm_span["queue_ms"] = round(acquire(provider, reserved) * 1000, 2)
+                granted = True
+                started = time.perf_counter()
+                for chunk in model.stream(prompt):
+                    if getattr(chunk, "usage_metadata", None):
+                        usage_message = chunk
+                    if not chunk.content:
+                        continue
+                    if not chunks:
+                        llm_span["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    chunks.append(chunk.content)
+                    yield chunk.content
+            except FAILOVER_ERRORS as e:
+                # A failed attempt gives its token reservation back, so failovers do not drain the bucket
+                if granted:
+                    settle(provider, reserved, 0)
+                last = i == len(providers) - 1 or bool(chunks)
+                _record_error(route, provider, failover=not last)
+                if last:
+                    raise
+                print(f"{provider} failed on route {route}, failing over to {providers[i + 1][0]}: {e}")
+                llm_span["failover"] = f"{type(e).__name__}: {e}"
+                continue
+            except Exception:
+                if granted:
+                    settle(provider, reserved, 0)
+                _record_error(route, provider, failover=False)
+                raise
+            text = "".join(chunks)
+            input_tokens, output_tokens = _usage(usage_message, prompt, text)
+            settle(provider, reserved, input_tokens + output_tokens)
+            llm_span["output_bytes"] = len(text.encode("utf-8"))
+            llm_span["cost_usd"] = _record(route, provider, time.perf_counter() - started, input_tokens, output_tokens)
+            if answered is not None:
+                answered["provider"] = provider
+            return
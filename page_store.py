@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from config import PAGE_DB_PATH, PAGE_RETENTION_DAYS
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# Page Store
+
+class PageStore:
+    """The last fetched version of every revalidated page, with its ETag, Last-Modified and content hash.
+
+    fetch_page(revalidate=True) sends the stored validators as If-None-Match /
+    If-Modified-Since and, on a 304, returns the stored page instead of
+    downloading it again. Pages not fetched for PAGE_RETENTION_DAYS are pruned
+    when the store is opened.
+    """
+
+    def __init__(self, path=PAGE_DB_PATH, retention_days=PAGE_RETENTION_DAYS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {"not_modified": 0, "changed": 0, "unchanged": 0, "new": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT NOT NULL,
+                    max_bytes INTEGER NOT NULL,
+                    etag TEXT NOT NULL DEFAULT '',
+                    last_modified TEXT NOT NULL DEFAULT '',
+                    content_hash TEXT NOT NULL,
+                    page BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (url, max_bytes)
+                )"""
+            )
+            conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - retention_days * 86400,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url, max_bytes):
+        """The stored entry as a dict (etag, last_modified, content_hash, page), or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, content_hash, page FROM pages WHERE url = ? AND max_bytes = ?",
+                (url, max_bytes),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, page = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": digest,
+                "page": json.loads(zlib.decompress(page))}
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, max_bytes, page, entry):
+        """Resolves a fetch against the stored entry and returns the page to use.
+
+        A 304 returns the stored page; any other successful, unskipped page is
+        stored. The result's "not_modified" and "changed" flags say which
+        happened ("changed" is None for a page seen for the first time).
+        """
+        if page["status"] == 304 and entry is not None:
+            with self._connect() as conn:
+                conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ? AND max_bytes = ?", (time.time(), url, max_bytes))
+            self._count("not_modified")
+            return {**entry["page"], "not_modified": True, "changed": False}
+
+        page = {**page, "not_modified": False, "changed": None}
+        if page["status"] != 200 or page["skipped"]:
+            return page
+        digest = content_hash(page["text"])
+        if entry is not None:
+            page["changed"] = digest != entry["content_hash"]
+        self._count("new" if entry is None else "changed" if page["changed"] else "unchanged")
+        headers = {name.lower(): value for name, value in page["headers"].items()}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, max_bytes, etag, last_modified, content_hash, page, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, max_bytes, headers.get("etag", ""), headers.get("last-modified", ""), digest,
+                 zlib.compress(json.dumps(page).encode("utf-8")), time.time()),
+            )
+        return page
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def page_store():
+    """The process-wide page store, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PageStore()
+    return _store
@@ -0,0 +1,81 @@
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import HTML_PARSER, PARSE_PROFILE_MEMORY
+from tracing import span
+
+FALLBACK_PARSER = "html.parser"
+
+# Targeted parses: only these subtrees are built, everything else is skipped while parsing.
+# Class filters match the raw attribute string because strainers see it before it is split.
+SEARCH_RESULTS = SoupStrainer("div", class_=re.compile(r"(^|\s)tF2Cxc(\s|$)"))
+ANCHORS = SoupStrainer("a")
+
+_stats_lock = threading.Lock()
+_stats = {"pages": 0, "fallbacks": 0, "total_ms": 0.0, "max_ms": 0.0, "max_peak_kib": 0.0}
+_recent = deque(maxlen=100)
+
+if PARSE_PROFILE_MEMORY:
+    tracemalloc.start()
+
+
+def _build(markup, parser, parse_only):
+    soup = BeautifulSoup(markup, parser, parse_only=parse_only)
+    # lxml can silently drop everything on badly broken input; treat that as a failure
+    if markup and not soup.contents and parse_only is None:
+        raise ValueError("parser produced an empty document")
+    return soup
+
+
+def parse_html(markup, parse_only=None, label=""):
+    """Parses markup with the configured backend (lxml by default).
+
+    Pass a SoupStrainer such as SEARCH_RESULTS or ANCHORS to build only the
+    needed subtrees. If the backend is missing or chokes on malformed markup
+    the page is re-parsed with the pure-Python html.parser. Every call
+    records its parse time (and peak traced memory when PARSE_PROFILE_MEMORY
+    is set) in parse_stats().
+    """
+    if PARSE_PROFILE_MEMORY:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    fallback = False
+    with span("parse", label=label, bytes=len(markup), targeted=parse_only is not None) as parse_span:
+        try:
+            soup = _build(markup, HTML_PARSER, parse_only)
+        except Exception as e:
+            if HTML_PARSER == FALLBACK_PARSER:
+                raise
+            print(f"{HTML_PARSER} failed on {label or 'page'}, falling back to {FALLBACK_PARSER}: {e}")
+            soup = BeautifulSoup(markup, FALLBACK_PARSER, parse_only=parse_only)
+            fallback = True
+        parse_span["fallback"] = fallback
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # Peak is process-wide, so under concurrent parses it is an upper bound
+    peak_kib = (tracemalloc.get_traced_memory()[1] - baseline) / 1024 if PARSE_PROFILE_MEMORY else 0.0
+    with _stats_lock:
+        _stats["pages"] += 1
+        _stats["fallbacks"] += fallback
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+        _stats["max_peak_kib"] = max(_stats["max_peak_kib"], peak_kib)
+        _recent.append({"label": label, "bytes": len(markup), "ms": round(elapsed_ms, 2),
+                        "peak_kib": round(peak_kib, 1), "fallback": fallback})
+    return soup
+
+
+def parse_stats():
+    """Aggregate parse timings plus the most recent per-page records."""
+    with _stats_lock:
+        stats = dict(_stats)
+        stats["avg_ms"] = stats["total_ms"] / stats["pages"] if stats["pages"] else 0.0
+        stats["recent"] = list(_recent)
+    return stats
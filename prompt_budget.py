@@ -0,0 +1,150 @@
+import math
+import threading
+
+import tiktoken
+
+from config import PROMPT_INPUT_TOKEN_BUDGET, TOKEN_ENCODING
+from tracing import span
+
+# -------------------------
+# Field Budgets
+#
+# Token caps per scraped field, in priority order: fields earlier in the
+# list are budgeted first and the later ones share whatever is left of the
+# total input budget. Fields not listed get DEFAULT_FIELD_BUDGET and come
+# last. Fields with a separator are deduplicated and trimmed snippet by
+# snippet; the rest are cut at a token boundary.
+
+FIELD_BUDGETS = {
+    "company_name": 32,
+    "company_official_website": 64,
+    "address": 64,
+    "phone_number": 16,
+    "employee_count": 16,
+    "annual_revenue": 32,
+    "recent_funding": 32,
+    "current_erp": 16,
+    "sic_codes": 16,
+    "leadership_changes": 200,
+    "recent_news": 200,
+    "recent_sap_job_postings": 150,
+    "strengths": 150,
+    "weaknesses": 150,
+    "opportunities": 150,
+    "threats": 150,
+    "web_research": 1500,
+}
+DEFAULT_FIELD_BUDGET = 100
+
+SNIPPET_SEPARATORS = {
+    "recent_sap_job_postings": ", ",
+    "web_research": "\n",
+}
+
+# Rough size of a token when the tokenizer cannot be loaded
+CHARS_PER_TOKEN = 4
+
+_encoding_lock = threading.Lock()
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, or None when it cannot be loaded (its BPE file is fetched once on first use)."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e:
+                print(f"Tokenizer {TOKEN_ENCODING} unavailable, estimating tokens from length: {e}")
+            _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, limit):
+    """Cuts text to at most limit tokens, backing off to the last whole word."""
+    encoding = _get_encoding()
+    if encoding is None:
+        cut = text[:limit * CHARS_PER_TOKEN]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= limit:
+            return text
+        cut = encoding.decode(tokens[:limit])
+    if len(cut) < len(text) and " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip()
+
+# -------------------------
+# Budgeting
+
+def _dedupe(text, separator):
+    snippets = [snippet.strip() for snippet in text.split(separator)]
+    unique = dict.fromkeys(snippet for snippet in snippets if snippet)
+    return separator.join(unique)
+
+
+def _trim_snippets(text, separator, limit):
+    """Keeps whole snippets while they fit; a first snippet that alone is too long is cut."""
+    kept, used = [], 0
+    for snippet in text.split(separator):
+        cost = count_tokens(snippet) + (count_tokens(separator) if kept else 0)
+        if used + cost > limit:
+            break
+        kept.append(snippet)
+        used += cost
+    if not kept and text:
+        return truncate_tokens(text.split(separator)[0], limit)
+    return separator.join(kept)
+
+
+def budget_fields(scraped_data, budgets=FIELD_BUDGETS, total_budget=PROMPT_INPUT_TOKEN_BUDGET):
+    """Returns a copy of scraped_data deduplicated and trimmed to the token budgets, plus the token counts.
+
+    The counts are {"tokens_before", "tokens_after", "tokens_trimmed",
+    "trimmed_fields"} and are also recorded on the current trace.
+    """
+    budgeted = dict(scraped_data)
+    order = [field for field in budgets if field in scraped_data]
+    order += [field for field in scraped_data if field not in budgets]
+
+    with span("prompt_budget", budget=total_budget) as budget_span:
+        remaining = total_budget
+        before = after = 0
+        trimmed_fields = {}
+        for field in order:
+            value = scraped_data[field]
+            if not isinstance(value, str) or not value:
+                continue
+            tokens = count_tokens(value)
+            limit = max(min(budgets.get(field, DEFAULT_FIELD_BUDGET), remaining), 0)
+            separator = SNIPPET_SEPARATORS.get(field)
+
+            text = _dedupe(value, separator) if separator else value
+            if count_tokens(text) > limit:
+                text = _trim_snippets(text, separator, limit) if separator else truncate_tokens(text, limit)
+            kept = count_tokens(text) if text != value else tokens
+
+            budgeted[field] = text
+            remaining -= kept
+            before += tokens
+            after += kept
+            if kept < tokens:
+                trimmed_fields[field] = tokens - kept
+
+        counts = {
+            "tokens_before": before,
+            "tokens_after": after,
+            "tokens_trimmed": before - after,
+            "trimmed_fields": trimmed_fields,
+        }
+        budget_span.update(counts)
+    return budgeted, counts
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from config import RATE_LIMIT_BURST_SECONDS, RATE_LIMIT_MAX_WAIT, RATE_LIMITS
+from metrics import percentile
+from tracing import current_trace_id
+
+# -------------------------
+# Outbound Rate Scheduler
+#
+# One limiter per provider, shared by every session and thread of the process,
+# so concurrent reps queue here instead of all hitting the provider and
+# collecting 429s. Each limiter has a requests-per-minute bucket and, for the
+# LLM providers, a tokens-per-minute bucket. Waiting callers are served round
+# robin per research request (trace), so one request that fans out into many
+# calls cannot starve the others.
+
+
+class RateLimitTimeout(Exception):
+    """A call waited longer than RATE_LIMIT_MAX_WAIT for its provider's rate limit."""
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second and holds at most burst_seconds worth."""
+
+    def __init__(self, per_minute, burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until amount is available; requests above the capacity only wait for a full bucket."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        # May go below zero: the next callers then wait for the overdraft to refill
+        self.level -= amount
+
+
+class ProviderLimiter:
+    """Fair queue in front of one provider's request and token buckets."""
+
+    def __init__(self, name, rpm=0, tpm=0):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._cond = threading.Condition()
+        # caller -> its waiting tickets; the first caller in line is served next
+        self._queues = OrderedDict()
+        self._waiting = 0
+        self._stats = {"granted": 0, "timeouts": 0, "max_queue_depth": 0, "tokens_reserved": 0}
+        self._waits = deque(maxlen=500)
+
+    def _delay(self, tokens):
+        delays = [self.requests.delay(1) if self.requests else 0.0]
+        if self.tokens and tokens:
+            delays.append(self.tokens.delay(tokens))
+        return max(delays)
+
+    def _leave(self, caller, ticket):
+        queue = self._queues[caller]
+        queue.remove(ticket)
+        self._waiting -= 1
+        # Served callers go to the back of the line, so callers take turns
+        self._queues.move_to_end(caller)
+        if not queue:
+            del self._queues[caller]
+        self._cond.notify_all()
+
+    def acquire(self, tokens=0, timeout=RATE_LIMIT_MAX_WAIT, caller=None):
+        """Blocks until the call fits the provider's limits and returns the seconds waited.
+
+        Raises RateLimitTimeout after timeout seconds in the queue.
+        """
+        if self.requests is None and self.tokens is None:
+            return 0.0
+        caller = caller or current_trace_id() or "untraced"
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(caller, deque()).append(ticket)
+            self._waiting += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._waiting)
+            while True:
+                remaining = started + timeout - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._leave(caller, ticket)
+                    raise RateLimitTimeout(f"{self.name}: no capacity within {timeout:g}s")
+                first_caller = next(iter(self._queues))
+                if first_caller == caller and self._queues[caller][0] is ticket:
+                    delay = self._delay(tokens)
+                    if delay == 0:
+                        break
+                    self._cond.wait(min(delay, remaining))
+                else:
+                    self._cond.wait(remaining)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens and tokens:
+                self.tokens.take(tokens)
+            self._leave(caller, ticket)
+            waited = time.monotonic() - started
+            self._stats["granted"] += 1
+            self._stats["tokens_reserved"] += tokens
+            self._waits.append(waited)
+        return waited
+
+    def settle(self, reserved, used):
+        """Corrects a token reservation once the call's real usage is known."""
+        if self.tokens is None:
+            return
+        with self._cond:
+            self.tokens.take(used - reserved)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = list(self._waits)
+            return {
+                **self._stats,
+                "queue_depth": self._waiting,
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+            }
+
+
+_limiters = {name: ProviderLimiter(name, **limits) for name, limits in RATE_LIMITS.items()}
+
+
+def acquire(provider, tokens=0):
+    """Waits for provider's rate limit (a no-op for providers without one) and returns the seconds waited."""
+    limiter = _limiters.get(provider)
+    return limiter.acquire(tokens) if limiter else 0.0
+
+
+def settle(provider, reserved, used):
+    limiter = _limiters.get(provider)
+    if limiter:
+        limiter.settle(reserved, used)
+
+
+def rate_stats():
+    """Queue depth, wait-time percentiles (seconds) and grant counts per provider that has seen traffic."""
+    stats = {name: limiter.stats() for name, limiter in _limiters.items()}
+    return {name: values for name, values in stats.items() if values["granted"] or values["queue_depth"] or values["timeouts"]}
@@ -0,0 +1,55 @@
+import re
+
+from extraction import ERP_KEYWORDS
+from prompt_budget import FIELD_BUDGETS, count_tokens
+from summary import cached_invoke
+
+# -------------------------
+# Field Refinement
+#
+# Small structured tasks on scraped fields, sent over the "extraction" route
+# to the fast model. Each task only runs when the regex result needs it, and
+# an answer that does not fit the expected shape keeps the original value.
+# Answers are cached like report completions, so refreshing an account whose
+# pages and research did not change sends none of these prompts again.
+
+REVENUE_FORMAT = re.compile(r"^\$\d+(\.\d+)? (thousand|million|billion|trillion)$")
+
+REVENUE_PROMPT = """Normalize this annual revenue figure to US dollars written as "$<number> <thousand|million|billion|trillion>", e.g. "$4.2 billion".
+Answer with the figure only, or "Unknown" if it is not a revenue figure.
+
+Revenue: {revenue}"""
+
+ERP_PROMPT = """Which ERP system does the company currently run, according to these sentences?
+Answer with exactly one of: {choices}, or "Unknown".
+
+{mentions}"""
+
+RESEARCH_PROMPT = """Condense these web research notes on {company_name} into at most {words} words of plain notes.
+Keep every figure, name, date and system mentioned; drop repetition and marketing language.
+
+{research}"""
+
+
+def normalize_revenue(revenue):
+    if not revenue or REVENUE_FORMAT.match(revenue):
+        return revenue
+    answer = cached_invoke("extraction", REVENUE_PROMPT.format(revenue=revenue), task="revenue").strip('" .')
+    return answer if REVENUE_FORMAT.match(answer) else revenue
+
+
+def classify_erp(mentions, current_erp):
+    if not mentions:
+        return current_erp
+    prompt = ERP_PROMPT.format(choices=", ".join(ERP_KEYWORDS), mentions="\n".join(f"- {mention}" for mention in mentions))
+    answer = cached_invoke("extraction", prompt, task="erp").strip('" .')
+    return answer if answer in ERP_KEYWORDS else current_erp
+
+
+def summarize_research(company_name, research, budget=FIELD_BUDGETS["web_research"]):
+    """Research notes over their token budget are condensed instead of being cut off at the budget."""
+    if count_tokens(research) <= budget:
+        return research
+    # Words run longer than tokens; leave headroom so the summary fits the budget
+    prompt = RESEARCH_PROMPT.format(company_name=company_name, words=budget * 2 // 3, research=research)
+    return cached_invoke("extraction", prompt, task="research") or research
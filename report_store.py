@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import REPORT_DB_PATH, REPORT_HISTORY_LIMIT, REPORT_TTL_HOURS
+from entities import company_key
+from shared_cache import get_json, set_json
+from tracing import span
+
+
+# -------------------------
+# Report Store
+
+class ReportStore:
+    """Persistent, versioned store of finished reports keyed by company (entities.company_key).
+
+    Every saved report is kept as a new version. Lookups only return the
+    latest version while it is younger than the freshness TTL, and each
+    lookup bumps a persisted hit or miss counter. The latest version is also
+    put in the shared cache, so a report written on one instance is found by
+    the others; a shared hit is saved locally as a version of its own.
+    Each version can carry the fingerprints of the fields it was written from
+    (summary.report_fingerprints), so a refresh can tell what changed.
+    """
+
+    def __init__(self, path=REPORT_DB_PATH, ttl_hours=REPORT_TTL_HOURS, history_limit=REPORT_HISTORY_LIMIT):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.history_limit = history_limit
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    company_key TEXT NOT NULL,
+                    company_name TEXT NOT NULL,
+                    report TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    fingerprints TEXT NOT NULL DEFAULT ''
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "fingerprints" not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN fingerprints TEXT NOT NULL DEFAULT ''")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_key ON reports (company_key, created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump(self, conn, name):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, company_name, max_age_seconds=None, count=True):
+        """Returns the latest fresh report text, or None on a miss.
+
+        With count=False the lookup is left out of the hit and miss counters,
+        e.g. when a research job re-checks for a report its submitter already looked up.
+        """
+        max_age = self.ttl_seconds if max_age_seconds is None else max_age_seconds
+        key = company_key(company_name)
+        with span("cache", cache="report_store") as cache_span, self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT report, created_at FROM reports WHERE company_key = ? ORDER BY created_at DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+            fresh = row is not None and time.time() - row[1] <= max_age
+            if not fresh:
+                shared = get_json(f"report:{key}")
+                if shared is not None and time.time() - shared["created_at"] <= max_age and (
+                    row is None or shared["created_at"] > row[1]
+                ):
+                    self._insert(conn, key, company_name, shared["report"], shared["created_at"], shared.get("fingerprints"))
+                    row, fresh = (shared["report"], shared["created_at"]), True
+            if count:
+                self._bump(conn, "hits" if fresh else "misses")
+            cache_span["hit"] = fresh
+        return row[0] if fresh else None
+
+    def _insert(self, conn, key, company_name, report, created_at, fingerprints=None):
+        conn.execute(
+            "INSERT INTO reports (company_key, company_name, report, created_at, fingerprints) VALUES (?, ?, ?, ?, ?)",
+            (key, company_name, report, created_at, json.dumps(fingerprints) if fingerprints else ""),
+        )
+        conn.execute(
+            "DELETE FROM reports WHERE company_key = ? AND id NOT IN ("
+            "SELECT id FROM reports WHERE company_key = ? ORDER BY created_at DESC LIMIT ?)",
+            (key, key, self.history_limit),
+        )
+
+    def put(self, company_name, report, fingerprints=None):
+        """Saves a new version and prunes versions beyond the history limit."""
+        key = company_key(company_name)
+        created_at = time.time()
+        with self._lock, self._connect() as conn:
+            self._insert(conn, key, company_name, report, created_at, fingerprints)
+        set_json(f"report:{key}", {"report": report, "created_at": created_at, "fingerprints": fingerprints},
+                 self.ttl_seconds)
+
+    def latest(self, company_name):
+        """The latest version however old, as a dict (report, created_at, fingerprints), or None.
+
+        Does not count as a lookup; refreshes use it to reuse what did not change.
+        """
+        key = company_key(company_name)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT report, created_at, fingerprints FROM reports WHERE company_key = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"report": row[0], "created_at": row[1], "fingerprints": json.loads(row[2]) if row[2] else {}}
+
+    def history(self, company_name):
+        """Lists past versions as (created_at, report) tuples, newest first."""
+        key = company_key(company_name)
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT created_at, report FROM reports WHERE company_key = ? ORDER BY created_at DESC",
+                (key,),
+            ).fetchall()
+
+    def stats(self):
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
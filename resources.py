@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+import time
+from io import BytesIO
+
+import streamlit as st
+from PIL import Image
+
+from config import WARM_UP
+from entities import alias_index
+from fill_template import preload_template
+from jobs import JobQueue
+from model_router import build_models
+from prompt_budget import count_tokens
+from report_store import ReportStore
+from search import enrichment_sources
+
+LOGO_PATH = "Logo-White.png"
+LOGO_WIDTH = 250
+
+# Streamlit re-executes the page script on every interaction. Everything below
+# is built once per server process and shared by all sessions; each resource
+# has a health check that runs on every cache hit, and one that fails is rebuilt.
+# The chat models live in model_router.py and are already built once per process.
+
+# -------------------------
+# Health Checks
+
+def _store_healthy(store):
+    # A deleted database file would otherwise be recreated without its tables
+    if not os.path.exists(store.path):
+        return False
+    try:
+        store.stats()
+        return True
+    except sqlite3.Error as e:
+        print(f"Report store unhealthy, reopening: {e}")
+        return False
+
+
+def _jobs_healthy(queue):
+    # Workers only stop when the queue is closed or a bug killed them
+    return os.path.exists(queue.path) and queue.healthy()
+
+# -------------------------
+# Cached Resources
+
+@st.cache_resource(show_spinner=False, validate=_store_healthy)
+def report_store():
+    return ReportStore()
+
+
+# The queue job_queue() built last. Streamlit drops a cached resource without
+# closing it, so a replaced queue is closed here and its workers stop.
+_live_queue = None
+_live_queue_lock = threading.Lock()
+
+
+def _close_job_queue():
+    global _live_queue
+    with _live_queue_lock:
+        queue, _live_queue = _live_queue, None
+    if queue is not None:
+        queue.close()
+
+
+@st.cache_resource(show_spinner=False, validate=_jobs_healthy)
+def job_queue():
+    """The background research workers, shared by every session of the process."""
+    global _live_queue
+    # Also reached when the health check failed, with the old queue still running
+    _close_job_queue()
+    queue = JobQueue(report_store())
+    with _live_queue_lock:
+        _live_queue = queue
+    return queue
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _logo(path, width, mtime):
+    image = Image.open(path)
+    if image.width > width:
+        image = image.resize((width, int(image.height * width / image.width)), resample=Image.BILINEAR)
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def load_logo(path=LOGO_PATH, width=LOGO_WIDTH):
+    """The logo as PNG bytes already at display width.
+
+    st.image resizes and re-encodes a PIL image on every call; bytes that
+    already fit are passed through untouched. A replaced file on disk is
+    picked up through its mtime.
+    """
+    return _logo(path, width, os.path.getmtime(path))
+
+
+# -------------------------
+# Warm-up
+
+def warm_up():
+    """Builds the clients the first research needs, so the first user does not wait for them."""
+    started = time.perf_counter()
+    steps = (
+        ("search tools", enrichment_sources),
+        ("company aliases", alias_index),
+        ("chat models", build_models),
+        ("report template", preload_template),
+        ("tokenizer", lambda: count_tokens("")),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+    print(f"Warm-up finished in {time.perf_counter() - started:.1f}s")
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Starts warm_up() in the background once per process; the page renders without waiting for it."""
+    if not WARM_UP:
+        return None
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# -------------------------
+# Lifecycle
+
+# name: (loader, cached function behind it, health check, cleanup before it is dropped)
+RESOURCES = {
+    "report_store": (report_store, report_store, _store_healthy, None),
+    "job_queue": (job_queue, job_queue, _jobs_healthy, _close_job_queue),
+    "logo": (load_logo, _logo, None, None),
+}
+
+
+def resource_health():
+    """Builds any missing resource and runs its health check; a failing resource is dropped for a rebuild."""
+    health = {}
+    for name, (load, _, check, _) in RESOURCES.items():
+        try:
+            resource = load()
+            health[name] = check(resource) if check else True
+        except Exception as e:
+            print(f"Resource {name} failed to load: {e}")
+            health[name] = False
+        if not health[name]:
+            release_resources(name)
+    return health
+
+
+def release_resources(name=None):
+    """Drops one cached resource, or all of them when name is None, so the next use rebuilds it."""
+    for key, (_, cached, _, cleanup) in RESOURCES.items():
+        if name is None or name == key:
+            if cleanup:
+                cleanup()
+            cached.clear()
@@ -0,0 +1,149 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ACQUISITION_TIMEOUT, ACQUISITION_WORKERS, LLM_REFINE
+from crawler import crawl_site
+from entities import alias_index
+from extraction import NO_JOB_POSTINGS, erp_mentions, extract_company_info
+from refinement import classify_erp, normalize_revenue, summarize_research
+from search import research_providers, research_search, site_search
+from tracing import event, in_current_context, span
+
+ENRICHMENT_QUERY = "{company_name} company headquarters revenue employees ERP leadership news"
+
+# Placeholders the extractors write when nothing was found
+MISSING_VALUES = ("", "Not Available", NO_JOB_POSTINGS)
+
+# Blocking sources run here; asyncio.run() does not join this pool on exit,
+# so a source that overruns the shared timeout never delays the caller.
+_executor = ThreadPoolExecutor(max_workers=ACQUISITION_WORKERS, thread_name_prefix="acquire")
+
+
+def empty_company_info(company_name):
+    return {
+        "company_name": company_name,
+        "address": "",
+        "employee_count": "",
+        "annual_revenue": "",
+        "leadership_changes": "",
+        "recent_news": "",
+        "recent_funding": "",
+        "current_erp": "",
+        "recent_sap_job_postings": "",
+        "phone_number": "",
+        "sic_codes": "",
+        "company_official_website": "",
+        "strengths": "",
+        "weaknesses": "",
+        "opportunities": "",
+        "threats": "",
+        "web_research": ""
+    }
+
+# -------------------------
+# Official Site Lookup
+
+def google_search(query):
+    """The official site for query, from the hedged site search (search.py)."""
+    return site_search.search(query)
+
+# -------------------------
+# Concurrent Acquisition
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, in_current_context(func, *args))
+
+
+async def _site_source(company_name, entity):
+    # A company researched before keeps its official site, whatever it is called this time
+    website = entity["website"] if entity and entity["website"] else None
+    website = website or await _run_blocking(google_search, f"{company_name} official site")
+    if not website:
+        return None, None
+    return website, await crawl_site(website)
+
+
+async def _refine(company_info, text):
+    """Runs the refinement tasks at once; a field whose task fails keeps its extracted value."""
+    tasks = {
+        "annual_revenue": _run_blocking(normalize_revenue, company_info["annual_revenue"]),
+        "current_erp": _run_blocking(classify_erp, erp_mentions(text), company_info["current_erp"]),
+        "web_research": _run_blocking(summarize_research, company_info["company_name"], company_info["web_research"]),
+    }
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for field, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            print(f"Refining {field} failed for {company_info['company_name']}: {result}")
+        else:
+            company_info[field] = result
+
+
+async def acquire_company_info(company_name, timeout=ACQUISITION_TIMEOUT):
+    """Runs the site lookup and the web research at once under one shared timeout.
+
+    Both go through hedged searches (search.py). Sources that fail or overrun
+    the timeout are dropped; the rest are merged into a single company_info
+    dict, with the company website taking precedence over search snippets. With LLM_REFINE the revenue, ERP and
+    research fields are then refined on the fast model (refinement.py), within what is left of the timeout; when
+    none is left, or refining overruns it, the extracted values are kept.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    company_info = empty_company_info(company_name)
+    # Searches use the known entity's name, so every spelling of it shares the search caches
+    entity = alias_index().entity(company_name)
+    search_name = entity["name"] if entity else company_name
+    query = ENRICHMENT_QUERY.format(company_name=search_name)
+
+    tasks = {"site": asyncio.create_task(_site_source(search_name, entity))}
+    if research_providers():
+        tasks["research"] = asyncio.create_task(_run_blocking(research_search.search, query, timeout))
+
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for name, task in tasks.items():
+        if task not in done:
+            print(f"Source {name} timed out for {company_name}")
+            event("source_timeout", source=name, timeout_s=timeout)
+        elif task.exception() is not None:
+            print(f"Source {name} failed for {company_name}: {task.exception()}")
+        else:
+            results[name] = task.result()
+
+    website, site = results.pop("site", (None, None))
+    if site and site["pages"]:
+        try:
+            with span("extraction", source="site", bytes=len(site["text"].encode("utf-8")), not_modified=site["not_modified"]):
+                extract_company_info(company_info, site["text"], site["links"])
+            company_info["company_official_website"] = website
+        except Exception as e:
+            print(f"Error scraping {company_name}: {e}")
+
+    research = results.get("research") or ""
+    if research:
+        company_info["web_research"] = research
+        with span("extraction", source="web_research", bytes=len(research.encode("utf-8"))):
+            found = extract_company_info(empty_company_info(company_name), research)
+        for key, value in found.items():
+            if company_info[key] in MISSING_VALUES and value not in MISSING_VALUES:
+                company_info[key] = value
+
+    if LLM_REFINE:
+        remaining = deadline - loop.time()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            text = "\n".join(text for text in (site and site["text"], research) if text)
+            await asyncio.wait_for(_refine(company_info, text), remaining)
+        except asyncio.TimeoutError:
+            print(f"Refinement skipped for {company_name}: the acquisition timeout of {timeout}s ran out")
+            event("refine_timeout", timeout_s=timeout)
+
+    return company_info
+
+
+def scrape_company_website(company_name):
+    return asyncio.run(acquire_company_info(company_name))
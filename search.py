@@ -0,0 +1,251 @@
+import functools
+import importlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import http_client
+from config import (
+    ACQUISITION_WORKERS,
+    ENRICHMENT_SOURCES,
+    GOOGLE_SEARCH_URL,
+    SEARCH_CACHE_ENTRIES,
+    SEARCH_CACHE_TTL_HOURS,
+    SEARCH_HEDGE_DELAY,
+    SEARCH_HEDGE_MIN_DELAY,
+    SEARCH_HEDGE_PERCENTILE,
+    SEARCH_TIMEOUT,
+    SITE_SEARCH_PROVIDERS,
+)
+from metrics import percentile
+from parsing import SEARCH_RESULTS, parse_html
+from rate_limiter import acquire
+from shared_cache import get_json, set_json
+from tracing import in_current_context, span
+
+# Search tools by name as (module, class). The LangChain integrations are slow to
+# import, so each one is only imported when the sources are first built.
+ENRICHMENT_PROVIDERS = {
+    "tavily": ("langchain_tavily", "TavilySearch"),
+    "duckduckgo": ("langchain_community.tools", "DuckDuckGoSearchRun"),
+    "serpapi": ("langchain_community.utilities", "SerpAPIWrapper"),
+}
+
+# Recent latencies a provider needs before its own percentile sets the hedge delay
+MIN_LATENCY_SAMPLES = 5
+
+# -------------------------
+# Providers
+#
+# A provider is a function from query to answer; an empty answer or an
+# exception counts as "no good answer" and the next provider is started.
+
+_enrichment_tools = None
+_enrichment_lock = threading.Lock()
+
+
+def enrichment_sources():
+    """Imports and builds the web search tools once; a tool whose package or API key is missing is skipped."""
+    global _enrichment_tools
+    with _enrichment_lock:
+        if _enrichment_tools is None:
+            tools = {}
+            for name, (module, class_name) in ENRICHMENT_PROVIDERS.items():
+                if name not in ENRICHMENT_SOURCES:
+                    continue
+                try:
+                    tools[name] = getattr(importlib.import_module(module), class_name)()
+                except Exception as e:
+                    print(f"Enrichment source {name} unavailable: {e}")
+            _enrichment_tools = tools
+    return _enrichment_tools
+
+
+def _result_text(result):
+    # TavilySearch returns a dict of results, the other tools return plain text
+    if isinstance(result, dict) and "results" in result:
+        return " ".join(item.get("content", "") for item in result["results"])
+    return str(result)
+
+
+def _google_site(query):
+    page = http_client.fetch_page(f"{GOOGLE_SEARCH_URL}?q={query.replace(' ', '+')}")
+    soup = parse_html(page["text"], parse_only=SEARCH_RESULTS, label=GOOGLE_SEARCH_URL)
+    for g in soup.find_all('div', class_='tF2Cxc'):
+        return g.find('a')['href']
+    return None
+
+
+def _tavily_site(tool, query):
+    results = tool.run(query).get("results") or [{}]
+    return results[0].get("url")
+
+
+def _serpapi_site(tool, query):
+    results = tool.results(query).get("organic_results") or [{}]
+    return results[0].get("link")
+
+
+def _research(tool, query):
+    return _result_text(tool.run(query))
+
+
+# Tools that can also answer the official-site lookup, besides the Google results page
+SITE_LOOKUPS = {"tavily": _tavily_site, "serpapi": _serpapi_site}
+
+
+def site_providers():
+    """(name, lookup) per SITE_SEARCH_PROVIDERS entry that is available, in preference order."""
+    tools = enrichment_sources()
+    providers = []
+    for name in SITE_SEARCH_PROVIDERS:
+        if name == "google":
+            providers.append((name, _google_site))
+        elif name in tools and name in SITE_LOOKUPS:
+            providers.append((name, functools.partial(SITE_LOOKUPS[name], tools[name])))
+    return providers
+
+
+def research_providers():
+    """(name, search) per configured enrichment tool, in ENRICHMENT_SOURCES order."""
+    tools = enrichment_sources()
+    return [(name, functools.partial(_research, tools[name])) for name in ENRICHMENT_SOURCES if name in tools]
+
+# -------------------------
+# Hedged Search
+
+def normalize_query(query):
+    """Folds case and whitespace so equivalent queries share one cache entry."""
+    return " ".join(query.lower().split())
+
+
+_executor = ThreadPoolExecutor(max_workers=ACQUISITION_WORKERS, thread_name_prefix="search")
+
+
+class HedgedSearch:
+    """Races search providers and returns the first good answer, cached per normalized query.
+
+    The preferred provider starts alone. Once it has run longer than its
+    usual latency (SEARCH_HEDGE_PERCENTILE of its recent calls), or as soon
+    as it fails or comes back empty, the next provider is started as well,
+    and so on down the list. The first non-empty answer wins; slower calls
+    finish in the background and only feed the latency samples. Answers are
+    also put in the shared cache, so other instances skip the providers too.
+    """
+
+    def __init__(self, kind, providers, ttl_hours=SEARCH_CACHE_TTL_HOURS, max_entries=SEARCH_CACHE_ENTRIES):
+        self.kind = kind
+        self.providers = providers
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "shared_hits": 0, "hedges": 0, "wins": {}}
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._cache.pop(key, None)
+            self._stats["misses"] += 1
+            return None
+
+    def _shared_key(self, key):
+        return f"search:{self.kind}:{key}"
+
+    def _remember(self, key, answer, provider=None):
+        with self._lock:
+            self._cache[key] = (time.time() + self.ttl_seconds, answer)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            if provider:
+                self._stats["wins"][provider] = self._stats["wins"].get(provider, 0) + 1
+
+    def hedge_delay(self, provider):
+        """Seconds to wait on provider before starting the next one."""
+        with self._lock:
+            samples = list(self._latencies.get(provider, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return SEARCH_HEDGE_DELAY
+        return max(percentile(samples, SEARCH_HEDGE_PERCENTILE), SEARCH_HEDGE_MIN_DELAY)
+
+    def _call(self, provider, func, query, hedged):
+        with span("search", kind=self.kind, provider=provider, query=query, hedged=hedged) as search_span:
+            search_span["queue_ms"] = round(acquire(provider) * 1000, 2)
+            started = time.perf_counter()
+            answer = func(query)
+            with self._lock:
+                self._latencies.setdefault(provider, deque(maxlen=100)).append(time.perf_counter() - started)
+            search_span["bytes"] = len(str(answer or "").encode("utf-8"))
+            return answer
+
+    def search(self, query, timeout=SEARCH_TIMEOUT):
+        """The first good answer for query, or None when every provider failed or the timeout passed."""
+        key = normalize_query(query)
+        with span("cache", cache="search", kind=self.kind) as cache_span:
+            answer = self._cached(key)
+            cache_span["hit"] = answer is not None
+        if answer is not None:
+            return answer
+        # Another instance may have answered this query already
+        answer = get_json(self._shared_key(key))
+        if answer is not None:
+            with self._lock:
+                self._stats["shared_hits"] += 1
+            self._remember(key, answer)
+            return answer
+
+        providers = self.providers()
+        deadline = time.monotonic() + timeout
+        running = {}
+        started = 0
+
+        def start_next():
+            nonlocal started
+            name, func = providers[started]
+            started += 1
+            future = _executor.submit(in_current_context(self._call, name, func, query, bool(running)))
+            running[future] = name
+            if started > 1:
+                with self._lock:
+                    self._stats["hedges"] += 1
+
+        if providers:
+            start_next()
+        while running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wait on the newest provider's usual latency while another is left to start
+            wait_for = min(remaining, self.hedge_delay(providers[started - 1][0])) if started < len(providers) else remaining
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    print(f"Search provider {name} failed for {query!r}: {future.exception()}")
+                elif future.result():
+                    self._remember(key, future.result(), name)
+                    set_json(self._shared_key(key), future.result(), self.ttl_seconds)
+                    return future.result()
+            # Nothing good yet: either the wait ran out or every finished provider came back empty
+            if started < len(providers):
+                start_next()
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "wins": dict(self._stats["wins"]), "entries": len(self._cache)}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+site_search = HedgedSearch("site", site_providers)
+research_search = HedgedSearch("research", research_providers)
@@ -0,0 +1,344 @@
+import json
+import os
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+from config import LOCK_LEASE_SECONDS, SHARED_CACHE_URL
+from tracing import span
+
+# -------------------------
+# Shared Cache and Lock Backends
+#
+# Caches that every instance of a scaled-out deployment can read, plus lease
+# locks so that only one node works on a company at a time. A backend stores
+# bytes under string keys with a TTL and offers three lock operations:
+#   acquire(name, owner, lease_seconds) -> bool   take the lock if free or expired
+#   refresh(name, owner, lease_seconds) -> bool   extend a lock still held by owner
+#   release(name, owner)                          drop the lock if owner holds it
+# A lock whose holder dies is free again once its lease runs out.
+
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SQLiteBackend:
+    """Backend in one SQLite file, for instances that share a filesystem (or a single host).
+
+    Uses the rollback journal rather than WAL: WAL needs shared memory, which
+    network filesystems (such as an App Service /home share) do not provide.
+    SQLite locking over a network share is only as reliable as the share, so
+    instances on separate hosts are better served by Redis.
+    """
+
+    PURGE_EVERY = 200
+
+    def __init__(self, path):
+        self.path = path
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, time.time() + ttl_seconds))
+            if purge:
+                conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def acquire(self, name, owner, lease_seconds):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.expires_at <= ? OR locks.owner = excluded.owner",
+                (name, owner, now + lease_seconds, now),
+            )
+            return cursor.rowcount == 1
+
+    def refresh(self, name, owner, lease_seconds):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ? AND expires_at > ?",
+                (now + lease_seconds, name, owner, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, name, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+class RedisError(Exception):
+    """An error reply from a Redis-protocol server."""
+
+
+class RedisBackend:
+    """Backend on a Redis-protocol (RESP) server, for instances on separate hosts.
+
+    Speaks the wire protocol directly over one connection per thread, in TLS
+    for rediss:// URLs (e.g. Azure Cache for Redis, which only allows TLS). Locks
+    are keys set with NX and a PX expiry; refresh and release check the
+    owner inside WATCH/MULTI/EXEC, so a lock taken over by another node
+    after its lease ran out is never extended or deleted.
+    """
+
+    KEY_PREFIX = "sales-research:"
+
+    def __init__(self, url, timeout=5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.tls = parsed.scheme == "rediss"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            if self.tls:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._call(conn, "AUTH", self.password)
+            if self.db:
+                self._call(conn, "SELECT", self.db)
+        return conn
+
+    def _call(self, conn, *args):
+        sock, reader = conn
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        sock.sendall(b"".join(parts))
+        return self._reply(reader)
+
+    def _reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by the server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else reader.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._reply(reader) for _ in range(size)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    def command(self, *args):
+        """Sends one command; a broken connection is reopened and the command retried once."""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                return self._call(conn, *args)
+            except (OSError, ConnectionError):
+                self._local.conn = None
+                conn[0].close()
+                if attempt:
+                    raise
+
+    def get(self, key):
+        return self.command("GET", self.KEY_PREFIX + key)
+
+    def set(self, key, value, ttl_seconds):
+        self.command("SET", self.KEY_PREFIX + key, value, "PX", max(int(ttl_seconds * 1000), 1))
+
+    def delete(self, key):
+        self.command("DEL", self.KEY_PREFIX + key)
+
+    def _lock_key(self, name):
+        return f"{self.KEY_PREFIX}lock:{name}"
+
+    def acquire(self, name, owner, lease_seconds):
+        if self.command("SET", self._lock_key(name), owner, "NX", "PX", int(lease_seconds * 1000)) == "OK":
+            return True
+        return self.refresh(name, owner, lease_seconds)
+
+    def _if_owner(self, name, owner, *command):
+        key = self._lock_key(name)
+        self.command("WATCH", key)
+        if self.command("GET", key) != owner.encode("utf-8"):
+            self.command("UNWATCH")
+            return False
+        self.command("MULTI")
+        self.command(*command)
+        # EXEC returns nil when the key changed after WATCH
+        return self.command("EXEC") is not None
+
+    def refresh(self, name, owner, lease_seconds):
+        return self._if_owner(name, owner, "PEXPIRE", self._lock_key(name), int(lease_seconds * 1000))
+
+    def release(self, name, owner):
+        self._if_owner(name, owner, "DEL", self._lock_key(name))
+
+
+def build_backend(url):
+    """The backend for a sqlite:///, redis:// or rediss:// URL; None for an empty URL."""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL {url!r}")
+
+
+_backend = None
+_backend_built = False
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """The process-wide backend from SHARED_CACHE_URL, or None when sharing is off or it cannot be built."""
+    global _backend, _backend_built
+    with _backend_lock:
+        if not _backend_built:
+            try:
+                _backend = build_backend(SHARED_CACHE_URL)
+            except Exception as e:
+                print(f"Shared cache unavailable, using per-process caches only: {e}")
+            _backend_built = True
+    return _backend
+
+# -------------------------
+# Shared Values
+#
+# JSON values, zlib-compressed. A backend that errors is treated as a miss,
+# so losing the shared cache only costs the cross-instance hits.
+
+def get_json(key):
+    store = backend()
+    if store is None:
+        return None
+    with span("cache", cache="shared", key=key.split(":")[0]) as cache_span:
+        try:
+            data = store.get(key)
+        except Exception as e:
+            print(f"Shared cache read of {key} failed: {e}")
+            data = None
+        cache_span["hit"] = data is not None
+    return json.loads(zlib.decompress(data)) if data is not None else None
+
+
+def set_json(key, value, ttl_seconds):
+    store = backend()
+    if store is None or ttl_seconds <= 0:
+        return
+    try:
+        store.set(key, zlib.compress(json.dumps(value).encode("utf-8")), ttl_seconds)
+    except Exception as e:
+        print(f"Shared cache write of {key} failed: {e}")
+
+# -------------------------
+# Lease Locks
+
+_lock_stats_lock = threading.Lock()
+_lock_stats = {"backend_failures": 0}
+
+
+def lock_stats():
+    """How often a lease was granted without the backend because it failed."""
+    with _lock_stats_lock:
+        return dict(_lock_stats)
+
+
+class Lease:
+    """A lock on name held by this node, renewed in the background until released.
+
+    acquire() does not block; it returns False while another node holds the
+    lease. .lost is set if a renewal fails, e.g. because the lease ran out
+    while the node was stalled. Without a shared backend every lease is
+    granted, since there is only this process to coordinate with. A backend
+    that fails also grants it, so research still runs, but every such grant
+    is reported and counted in lock_stats().
+    """
+
+    def __init__(self, name, lease_seconds=LOCK_LEASE_SECONDS):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = f"{NODE_ID}:{uuid.uuid4().hex[:8]}"
+        self.lost = False
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def acquire(self):
+        store = backend()
+        if store is None:
+            return True
+        try:
+            acquired = store.acquire(self.name, self.owner, self.lease_seconds)
+        except Exception as e:
+            with _lock_stats_lock:
+                _lock_stats["backend_failures"] += 1
+            print(f"WARNING: lock backend failed for {self.name}, proceeding WITHOUT the lock; "
+                  f"other servers may research the same company at once: {type(e).__name__}: {e}")
+            return True
+        if acquired:
+            self._renewer = threading.Thread(target=self._renew, name=f"lease-{self.name}", daemon=True)
+            self._renewer.start()
+        return acquired
+
+    def _renew(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                renewed = backend().refresh(self.name, self.owner, self.lease_seconds)
+            except Exception as e:
+                print(f"Renewing lock {self.name} failed: {e}")
+                renewed = False
+            if not renewed:
+                self.lost = True
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._renewer is None:
+            return
+        self._renewer.join()
+        try:
+            backend().release(self.name, self.owner)
+        except Exception as e:
+            print(f"Releasing lock {self.name} failed, it expires with its lease: {e}")
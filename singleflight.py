@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import Future
+
+from tracing import span
+
+# -------------------------
+# Single-flight
+#
+# Concurrent calls with the same key share one execution: the first caller
+# (the leader) runs the work and every caller arriving while it is in flight
+# waits on the leader's future and gets the same result or exception.
+# Nothing is cached once the call completes; that is the caches' job.
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            with span("coalesced", flight=self.name):
+                return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._in_flight)}
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def flight(name):
+    """The process-wide SingleFlight registered under name."""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def coalescing_stats():
+    """Calls, executions and coalesced calls per flight."""
+    with _flights_lock:
+        flights = dict(_flights)
+    return {name: group.stats() for name, group in flights.items()}
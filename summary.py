@@ -0,0 +1,386 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.prompts import PromptTemplate
+from openai.types.chat import ChatCompletion
+
+from config import REPORT_MODE, SECTION_RESEARCH_TOKENS, SECTION_RETRIES, SECTION_RETRY_BACKOFF, SECTION_WORKERS
+from llm_cache import LLMCache, cache_key
+from metrics import percentile
+from model_router import ROUTE_TEMPERATURES, cache_model, complete, stream
+from prompt_budget import budget_fields, truncate_tokens
+from tracing import in_current_context, span
+
+SUMMARY_FAILED = "Summary generation failed."
+
+# -------------------------
+# Response Cache
+#
+# Reports are generated on the "synthesis" route of model_router.py; the
+# field refinement answers (refinement.py) on the "extraction" route share the cache.
+
+response_cache = LLMCache()
+
+
+def prompt_cache_key(prompt, route="synthesis", provider=None):
+    """Lookups leave provider out; completions are stored under the provider that answered (see cache_model)."""
+    return cache_key(cache_model(route, provider), ROUTE_TEMPERATURES[route], prompt)
+
+
+def _cached_response(key, prompt):
+    with span("cache", cache="llm") as cache_span:
+        cached = response_cache.get(key, prompt_bytes=len(prompt.encode("utf-8")))
+        cache_span["hit"] = cached is not None
+    return cached
+
+
+def cached_invoke(route, prompt, **attrs):
+    """invoke() through response_cache, so a prompt answered before is not sent again."""
+    key = prompt_cache_key(prompt, route)
+    cached = _cached_response(key, prompt)
+    if cached is not None:
+        return cached
+    text, provider = complete(route, prompt, **attrs)
+    response_cache.put(prompt_cache_key(prompt, route, provider), text)
+    return text
+
+# -------------------------
+# Prompt Template
+
+prompt_template = PromptTemplate(
+    input_variables=["company_name", "scraped_data"],
+    template="""
+You are a business intelligence assistant creating a report on **{company_name}**.
+Use the web research notes below to enrich any missing information.
+
+Web research notes:
+{scraped_data[web_research]}
+
+**Company Report**
+
+## Company Overview
+- **Company Name:** {company_name}
+- **Address:** {scraped_data[address]}
+- **Employee Count:** {scraped_data[employee_count]}
+- **Annual Revenue:** {scraped_data[annual_revenue]}
+
+## Recent Developments
+- **Leadership Changes:** {scraped_data[leadership_changes]}
+- **Recent News:** {scraped_data[recent_news]}
+- **Recent SAP Job Postings:** {scraped_data[recent_sap_job_postings]}
+
+## Financial & Industry Insights
+- **Recent Funding:** {scraped_data[recent_funding]}
+- **ERP System:** {scraped_data[current_erp]}
+- **SIC Codes:** {scraped_data[sic_codes]}
+
+## SWOT Analysis
+- **Strengths:** {scraped_data[strengths]}
+- **Weaknesses:** {scraped_data[weaknesses]}
+- **Opportunities:** {scraped_data[opportunities]}
+- **Threats:** {scraped_data[threats]}
+
+## Contact Information
+- **Phone:** {scraped_data[phone_number]}
+- **Address:** {scraped_data[address]}
+- **Official Website:** {scraped_data[company_official_website]}
+
+## Disclaimer
+Some info may be outdated. Refer to the official website for the latest updates.
+"""
+)
+
+# -------------------------
+# Final Report Generator
+
+def render_prompt(company_name, scraped_data, template=None):
+    """Fills the template (this module's unless one is given) with the scraped fields cut to the token budget.
+
+    Returns the prompt and the budget's token counts.
+    """
+    fields, budget = budget_fields(scraped_data)
+    return (template or prompt_template).format(company_name=company_name, scraped_data=fields), budget
+
+
+def generate_summary(company_name, scraped_data, template=None, on_error=print, previous=None):
+    """Renders the prompt (this module's template unless one is given) and returns the report text.
+
+    With REPORT_MODE=sections the report is generated section by section instead.
+    With previous (a saved report, see refresh_prompts) only the sections whose inputs changed are.
+    """
+    refresh = refresh_prompts(company_name, scraped_data, template, previous) if previous else None
+    if refresh is not None or REPORT_MODE == "sections":
+        sections = refresh[0] if refresh is not None else section_prompts(company_name, scraped_data, template)[0]
+        parts = list(run_sections(sections, on_error))
+        # Finished sections stay in response_cache, so a retry only regenerates the failed ones
+        return SUMMARY_FAILED if any(failed for _, failed in parts) else "\n\n".join(text for text, _ in parts)
+
+    prompt, _ = render_prompt(company_name, scraped_data, template)
+    key = prompt_cache_key(prompt)
+    cached = _cached_response(key, prompt)
+    if cached is not None:
+        return cached
+    try:
+        report, provider = complete("synthesis", prompt)
+        response_cache.put(prompt_cache_key(prompt, provider=provider), report)
+        return report
+    except Exception as e:
+        on_error(f"Error generating summary: {e}")
+        return SUMMARY_FAILED
+
+
+# -------------------------
+# Section-wise Report Generator
+#
+# Every "## " heading of a template starts a section. Each section is its own
+# completion: the template preamble (instructions and research notes) plus
+# that section's lines, filled with the fields it references. All sections
+# run at once and are merged back in template order. Sections without any
+# placeholder are copied verbatim.
+
+SECTION_HEADING = re.compile(r"^## ", re.M)
+SECTION_PLACEHOLDER = re.compile(r"\{(company_name|scraped_data\[\w+\])\}")
+SECTION_INSTRUCTION = (
+    "\nWrite only the following section of the report, starting with its heading and keeping its structure. "
+    "Do not write any other section.\n\n"
+)
+
+_section_executor = ThreadPoolExecutor(max_workers=SECTION_WORKERS, thread_name_prefix="section")
+
+# pydantic builds a response model's serializer on first use; concurrent first
+# uses can race and dump the completion as {}, so build it before fanning out
+ChatCompletion.model_construct(choices=[]).model_dump()
+
+
+def split_sections(template):
+    """Splits a report template into its preamble and its sections, in template order."""
+    text = template.template
+    starts = [match.start() for match in SECTION_HEADING.finditer(text)]
+    if not starts:
+        return text, []
+    bounds = starts + [len(text)]
+    return text[:starts[0]], [text[start:end].strip() for start, end in zip(bounds, bounds[1:])]
+
+
+def section_prompts(company_name, scraped_data, template=None):
+    """Returns one (heading, prompt, static) entry per section plus the budget's token counts.
+
+    Static sections carry their final text instead of a prompt. The research
+    notes are cut to SECTION_RESEARCH_TOKENS, since every section receives them.
+    """
+    preamble, sections = split_sections(template or prompt_template)
+    fields, budget = budget_fields(scraped_data)
+    fields["web_research"] = truncate_tokens(fields.get("web_research", ""), SECTION_RESEARCH_TOKENS)
+
+    entries = []
+    for section in sections:
+        heading = section.splitlines()[0]
+        if SECTION_PLACEHOLDER.search(section):
+            prompt = (preamble + SECTION_INSTRUCTION + section).format(company_name=company_name, scraped_data=fields)
+            entries.append((heading, prompt, False))
+        else:
+            entries.append((heading, section.replace("{{", "{").replace("}}", "}"), True))
+    return entries, budget
+
+
+def _generate_section(heading, prompt):
+    """One section's completion, retried on its own with exponential backoff."""
+    key = prompt_cache_key(prompt)
+    cached = _cached_response(key, prompt)
+    if cached is not None:
+        return cached
+    for attempt in range(SECTION_RETRIES + 1):
+        try:
+            text, provider = complete("synthesis", prompt, section=heading, attempt=attempt + 1)
+            response_cache.put(prompt_cache_key(prompt, provider=provider), text)
+            return text
+        except Exception as e:
+            if attempt == SECTION_RETRIES:
+                raise
+            print(f"Section {heading} failed (attempt {attempt + 1}), retrying: {e}")
+            time.sleep(SECTION_RETRY_BACKOFF * 2 ** attempt)
+
+
+def run_sections(sections, on_error=print):
+    """Starts every section at once and yields (text, failed) per section in template order."""
+    futures = [
+        None if static else _section_executor.submit(in_current_context(_generate_section, heading, prompt))
+        for heading, prompt, static in sections
+    ]
+    for (heading, text, static), future in zip(sections, futures):
+        if static:
+            yield text, False
+            continue
+        try:
+            yield future.result(), False
+        except Exception as e:
+            on_error(f"Error generating section {heading}: {e}")
+            yield f"{heading}\n{SUMMARY_FAILED}", True
+
+# -------------------------
+# Incremental Refresh
+#
+# Every saved report keeps a fingerprint (short hash) of the template and of
+# each field it was written from. When a stale report is refreshed, a section
+# of the previous report is reused verbatim unless a field it references
+# changed, so an unchanged company costs no completions at all. The research
+# notes are background for every section and do not force a rewrite on their own.
+
+def _fingerprint(value):
+    return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:16]
+
+
+def report_fingerprints(company_name, scraped_data, template=None):
+    """Short hashes of the template, the company name and every scraped field."""
+    fingerprints = {field: _fingerprint(value) for field, value in scraped_data.items()}
+    fingerprints["company_name"] = _fingerprint(company_name)
+    fingerprints["template"] = _fingerprint((template or prompt_template).template)
+    return fingerprints
+
+
+def section_fields(section):
+    """The fields a template section references ("company_name" or a scraped_data key)."""
+    placeholders = (match.group(1) for match in SECTION_PLACEHOLDER.finditer(section))
+    return {name[len("scraped_data["):-1] if name.startswith("scraped_data[") else name for name in placeholders}
+
+
+def split_report(report):
+    """A finished report's sections keyed by their heading line."""
+    starts = [match.start() for match in SECTION_HEADING.finditer(report)]
+    bounds = starts + [len(report)]
+    sections = (report[start:end].strip() for start, end in zip(bounds, bounds[1:]))
+    return {section.splitlines()[0].strip(): section for section in sections}
+
+
+def refresh_prompts(company_name, scraped_data, template, previous):
+    """Like section_prompts(), but sections whose fields did not change carry their previous text.
+
+    previous is a saved report as returned by ReportStore.latest(). Returns
+    the entries, the budget's token counts and the headings reused, or None
+    when nothing can be reused (no fingerprints or a different template).
+    """
+    old = previous.get("fingerprints") or {}
+    new = report_fingerprints(company_name, scraped_data, template)
+    if old.get("template") != new["template"]:
+        return None
+    changed = {field for field, fingerprint in new.items() if old.get(field) != fingerprint}
+    previous_sections = split_report(previous["report"])
+    _, sections = split_sections(template or prompt_template)
+    entries, budget = section_prompts(company_name, scraped_data, template)
+    reused = []
+    for i, (section, (heading, _, static)) in enumerate(zip(sections, entries)):
+        if static or heading.strip() not in previous_sections or section_fields(section) & changed:
+            continue
+        entries[i] = (heading, previous_sections[heading.strip()], True)
+        reused.append(heading)
+    return entries, budget, reused
+
+# -------------------------
+# Streaming Report Generator
+
+_metrics_lock = threading.Lock()
+_ttft_samples = deque(maxlen=500)
+_total_samples = deque(maxlen=500)
+
+
+def latency_stats():
+    """Time-to-first-token and full-completion latency (seconds) over recent streamed reports."""
+    with _metrics_lock:
+        ttft, total = list(_ttft_samples), list(_total_samples)
+    return {
+        "reports": len(total),
+        "ttft_p50": percentile(ttft, 50),
+        "ttft_p95": percentile(ttft, 95),
+        "total_p50": percentile(total, 50),
+        "total_p95": percentile(total, 95),
+    }
+
+
+class SummaryStream:
+    """Iterates over report tokens as the model produces them.
+
+    Hand it to st.write_stream to render the report while it is generated;
+    once iteration finishes, .text holds the full report (SUMMARY_FAILED if
+    the call errored) and .ttft the time to first token in seconds. Prompts
+    already answered are replayed from response_cache without calling the model.
+    .budget holds the prompt's token counts before and after budgeting.
+
+    With REPORT_MODE=sections each section is yielded whole as soon as it and
+    every section before it are done; .failed is set if any section failed.
+    Refreshing with previous (see refresh_prompts) works section by section
+    too, and .reused lists the sections carried over from the previous report.
+    .fingerprints is what ReportStore.put() needs to refresh this report later.
+    """
+
+    def __init__(self, company_name, scraped_data, template=None, on_error=print, previous=None):
+        refresh = refresh_prompts(company_name, scraped_data, template, previous) if previous else None
+        self.sectioned = refresh is not None or REPORT_MODE == "sections"
+        self.reused = []
+        self.fingerprints = report_fingerprints(company_name, scraped_data, template)
+        if refresh is not None:
+            self.prompt = None
+            self.sections, self.budget, self.reused = refresh
+        elif self.sectioned:
+            self.prompt = None
+            self.sections, self.budget = section_prompts(company_name, scraped_data, template)
+        else:
+            self.prompt, self.budget = render_prompt(company_name, scraped_data, template)
+        self.on_error = on_error
+        self.text = ""
+        self.failed = False
+        self.cached = False
+        self.ttft = None
+
+    def _iter_sections(self):
+        started = time.perf_counter()
+        parts = []
+        for text, failed in run_sections(self.sections, self.on_error):
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - started
+            self.failed = self.failed or failed
+            parts.append(text)
+            yield ("\n\n" if len(parts) > 1 else "") + text
+        self.text = "\n\n".join(parts)
+        if not self.failed and self.ttft is not None:
+            with _metrics_lock:
+                _ttft_samples.append(self.ttft)
+                _total_samples.append(time.perf_counter() - started)
+
+    def __iter__(self):
+        if self.sectioned:
+            yield from self._iter_sections()
+            return
+
+        key = prompt_cache_key(self.prompt)
+        cached = _cached_response(key, self.prompt)
+        if cached is not None:
+            self.cached = True
+            self.text = cached
+            yield cached
+            return
+
+        started = time.perf_counter()
+        chunks = []
+        answered = {}
+        try:
+            for chunk in stream("synthesis", self.prompt, answered):
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - started
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            self.failed = True
+            self.on_error(f"Error generating summary: {e}")
+            yield f"\n\n{SUMMARY_FAILED}" if chunks else SUMMARY_FAILED
+
+        self.text = SUMMARY_FAILED if self.failed else "".join(chunks).strip()
+        if not self.failed and self.text:
+            response_cache.put(prompt_cache_key(self.prompt, provider=answered.get("provider")), self.text)
+        if not self.failed and self.ttft is not None:
+            with _metrics_lock:
+                _ttft_samples.append(self.ttft)
+                _total_samples.append(time.perf_counter() - started)
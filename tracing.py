@@ -0,0 +1,171 @@
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import REQUEST_LOG_BACKUPS, REQUEST_LOG_MAX_MB, REQUEST_LOG_PATH
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Timed spans collected for one research request; spans may be added from any thread."""
+
+    def __init__(self, kind, attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.error = ""
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def record(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        return {
+            "trace_id": self.id,
+            "kind": self.kind,
+            **self.attrs,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.started_at)) + f".{int(self.started_at % 1 * 1000):03d}Z",
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def trace_request(kind, **attrs):
+    """Collects the spans of everything run inside the block and logs them as one record.
+
+    The record is handed to a background writer, so the caller never waits on disk.
+    """
+    trace = Trace(kind, attrs)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _write(trace.record())
+
+
+def current_trace_id():
+    """Id of the request being traced in this context, or None."""
+    trace = _current.get()
+    return trace.id if trace is not None else None
+
+
+@contextmanager
+def span(name, **attrs):
+    """Times the block as a span of the current trace; a no-op outside trace_request().
+
+    Yields the span's attribute dict so the block can add byte counts,
+    status codes or cache outcomes. An exception is recorded and re-raised.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.add({
+            "name": name,
+            "start_ms": round((started - trace.started) * 1000, 2),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            **attrs,
+        })
+
+
+def event(name, **attrs):
+    """Records an instant span, e.g. a source that was abandoned at its timeout."""
+    with span(name, **attrs):
+        pass
+
+
+def in_current_context(func, *args):
+    """Binds func to the caller's context, so spans from executor threads land in the caller's trace."""
+    return functools.partial(contextvars.copy_context().run, func, *args)
+
+# -------------------------
+# Request Log Writer
+
+class _RecordQueueHandler(QueueHandler):
+    def prepare(self, record):
+        return record  # serialized on the writer thread, not the request thread
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=str)
+
+
+_logger = logging.getLogger("request_log")
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+_writer_lock = threading.Lock()
+_listener = None
+
+
+def _start_writer():
+    global _listener
+    if os.path.dirname(REQUEST_LOG_PATH):
+        os.makedirs(os.path.dirname(REQUEST_LOG_PATH), exist_ok=True)
+    handler = RotatingFileHandler(
+        REQUEST_LOG_PATH,
+        maxBytes=int(REQUEST_LOG_MAX_MB * 1024 * 1024),
+        backupCount=REQUEST_LOG_BACKUPS,
+        encoding="utf-8",
+        delay=True,
+    )
+    handler.setFormatter(_JsonFormatter())
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    _logger.addHandler(_RecordQueueHandler(records))
+
+
+def _write(record):
+    if not REQUEST_LOG_PATH:
+        return
+    with _writer_lock:
+        if _listener is None:
+            _start_writer()
+        _logger.info(record)
+
+
+def flush_request_log():
+    """Blocks until every queued record is on disk; the writer restarts on the next record."""
+    global _listener
+    with _writer_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in list(_logger.handlers):
+                _logger.removeHandler(handler)
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+atexit.register(flush_request_log)